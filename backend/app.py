@@ -1,9 +1,9 @@
 from flask import Flask
 from routes.auth import auth_bp
 from routes.gateway import gateway_bp
-from database import init_db
+from database import init_db, db
 from flask_cors import CORS
-from telemetry import configure_telemetry
+from shared.telemetry import configure_telemetry
 
 
 app = Flask(__name__)
@@ -16,7 +16,7 @@ app.register_blueprint(gateway_bp)
 
 init_db(app)
 
-configure_telemetry(app, "backend")
+configure_telemetry(app, "backend", db=db)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,334 @@
+"""
+Mede o custo da instrumentação OpenTelemetry nos endpoints mais usados.
+
+Cada serviço roda em processo próprio (os serviços usam módulos com o mesmo
+nome: app, database, models, routes), com SQLite temporário e o Flask test
+client, em três modos:
+
+    off   -> OTEL_SDK_DISABLED=true (sem instrumentação)
+    noop  -> instrumentação completa, spans descartados (OTEL_TRACES_EXPORTER=none)
+    otlp  -> instrumentação completa exportando para um sink OTLP/HTTP local
+
+Nos modos instrumentados as métricas RED são exportadas para o mesmo sink.
+
+Para cada combinação são reportados percentis de latência, CPU por
+requisição (inclui a thread do BatchSpanProcessor) e memória alocada.
+
+Uso:
+    python backend/bench/telemetry_overhead.py
+    python backend/bench/telemetry_overhead.py --services products cart --requests 2000
+    python backend/bench/telemetry_overhead.py --save baseline.json
+    python backend/bench/telemetry_overhead.py --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIB_DIR = os.path.join(BACKEND_DIR, "lib")
+
+SERVICES = ["products", "cart", "orders", "checkout"]
+MODES = ["off", "noop", "otlp"]
+
+
+# ===============================================================
+# Servidores HTTP locais (sink OTLP e stubs de serviços vizinhos)
+# ===============================================================
+def _start_server(handler_cls):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class OTLPSinkHandler(BaseHTTPRequestHandler):
+    """Aceita qualquer exportação OTLP/HTTP e responde 200"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-protobuf")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class DownstreamStubHandler(BaseHTTPRequestHandler):
+    """Responde como products (GET /products/<id>) e orders (POST /orders/)"""
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        product_id = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+        self._reply(200, _product(product_id))
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(201, {"message": "Pedido criado com sucesso", "order_id": 1})
+
+    def log_message(self, *args):
+        pass
+
+
+def _product(product_id):
+    return {
+        "id": product_id, "name": f"Produto {product_id}", "price": 10.0 + product_id,
+        "description": "benchmark", "image_url": None, "stock": 1000,
+    }
+
+
+# ===============================================================
+# Preparação de cada serviço (roda dentro do processo do worker)
+# ===============================================================
+def setup_products(app_module):
+    from database import db
+    from models import Product
+
+    with app_module.app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Product(name=f"Produto {i}", price=10.0 + i, description="benchmark", stock=1000)
+            for i in range(1, 21)
+        ])
+        db.session.commit()
+    return lambda client: client.get("/products/")
+
+
+def setup_cart(app_module):
+    from database import db
+    from models import CartItem
+    import routes.cart as cart_routes
+
+    with app_module.app.app_context():
+        db.session.add_all([CartItem(user_id=1, product_id=i, quantity=1) for i in range(1, 6)])
+        db.session.commit()
+    _prefill_product_cache(cart_routes.product_cache, range(1, 6))
+
+    def request(client):
+        return client.get("/cart/")
+    request.needs_session = True
+    return request
+
+
+def setup_orders(app_module):
+    from database import db
+    from models import Order, OrderItem
+    import routes.orders as orders_routes
+
+    with app_module.app.app_context():
+        for _ in range(20):
+            order = Order(user_id=1, total=30.0)
+            db.session.add(order)
+            db.session.flush()
+            db.session.add_all([
+                OrderItem(order_id=order.id, product_id=i, quantity=1, price=10.0) for i in range(1, 4)
+            ])
+        db.session.commit()
+    _prefill_product_cache(orders_routes.product_cache, range(1, 4))
+    return lambda client: client.get("/orders/?user_id=1")
+
+
+def setup_checkout(app_module):
+    import routes.checkout as checkout_routes
+
+    stub = _start_server(DownstreamStubHandler)
+    base = f"http://127.0.0.1:{stub.server_address[1]}"
+    checkout_routes.PRODUCTS_API_URL = f"{base}/products/"
+    checkout_routes.ORDERS_API_URL = f"{base}/orders/"
+
+    payload = {"user_id": 1, "cart_items": [{"product_id": i, "quantity": 1} for i in range(1, 4)]}
+    return lambda client: client.post("/checkout/", json=payload)
+
+
+def _prefill_product_cache(cache, product_ids):
+    import datetime
+
+    # TTL alto o suficiente para não expirar durante a medição
+    for product_id in product_ids:
+        cache[product_id] = {"data": _product(product_id), "timestamp": datetime.datetime.now() + datetime.timedelta(days=1)}
+
+
+SETUP = {
+    "products": setup_products,
+    "cart": setup_cart,
+    "orders": setup_orders,
+    "checkout": setup_checkout,
+}
+
+
+def _percentile(sorted_values, q):
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_worker(service, n_requests, warmup, alloc_requests):
+    sys.path.insert(0, os.getcwd())
+    import app as app_module
+
+    request = SETUP[service](app_module)
+    client = app_module.app.test_client()
+    if getattr(request, "needs_session", False):
+        with client.session_transaction() as session:
+            session["user_id"] = 1
+
+    for _ in range(warmup):
+        request(client)
+
+    latencies = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(n_requests):
+        start = time.perf_counter_ns()
+        response = request(client)
+        latencies.append(time.perf_counter_ns() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{service}: resposta {response.status_code}: {response.get_data(as_text=True)}")
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    # Alocações medidas numa rodada separada (tracemalloc distorce a latência)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(alloc_requests):
+        request(client)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "requests": n_requests,
+        "p50_us": _percentile(latencies, 0.50) / 1000,
+        "p95_us": _percentile(latencies, 0.95) / 1000,
+        "p99_us": _percentile(latencies, 0.99) / 1000,
+        "throughput_rps": n_requests / wall,
+        "cpu_us_per_request": cpu / n_requests * 1e6,
+        "retained_bytes_per_request": max(after - before, 0) / alloc_requests,
+        "peak_alloc_kib": (peak - before) / 1024,
+    }
+
+
+# ===============================================================
+# Driver
+# ===============================================================
+def run_case(service, mode, args, sink_endpoint):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), f"{service}.db")
+    env = dict(
+        os.environ,
+        PYTHONPATH=LIB_DIR,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        OUTBOX_BACKEND="memory",
+    )
+    env.pop("OTEL_SDK_DISABLED", None)
+    env.pop("OTEL_TRACES_EXPORTER", None)
+    # Métricas são exportadas para o sink em todos os modos instrumentados
+    env["OTEL_EXPORTER_OTLP_METRICS_ENDPOINT"] = sink_endpoint.replace("/v1/traces", "/v1/metrics")
+    if mode == "off":
+        env["OTEL_SDK_DISABLED"] = "true"
+    elif mode == "noop":
+        env["OTEL_TRACES_EXPORTER"] = "none"
+    else:
+        env["OTEL_EXPORTER_OTLP_TRACES_ENDPOINT"] = sink_endpoint
+
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", service,
+         "--requests", str(args.requests), "--warmup", str(args.warmup),
+         "--alloc-requests", str(args.alloc_requests)],
+        cwd=os.path.join(BACKEND_DIR, service), env=env,
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha no benchmark {service}/{mode}:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_report(results):
+    header = (f"{'serviço':<10}{'modo':<6}{'p50 µs':>9}{'p95 µs':>9}{'p99 µs':>9}"
+              f"{'cpu µs/req':>12}{'overhead':>10}{'B/req':>8}{'pico KiB':>10}")
+    print(header)
+    print("-" * len(header))
+    for service, by_mode in results.items():
+        base_cpu = by_mode.get("off", {}).get("cpu_us_per_request")
+        for mode, r in by_mode.items():
+            overhead = f"{r['cpu_us_per_request'] / base_cpu - 1:+.0%}" if base_cpu and mode != "off" else "-"
+            print(f"{service:<10}{mode:<6}{r['p50_us']:>9.0f}{r['p95_us']:>9.0f}{r['p99_us']:>9.0f}"
+                  f"{r['cpu_us_per_request']:>12.0f}{overhead:>10}"
+                  f"{r['retained_bytes_per_request']:>8.0f}{r['peak_alloc_kib']:>10.0f}")
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Retorna as regressões de p50/CPU acima da tolerância em relação ao baseline"""
+    regressions = []
+    for service, by_mode in results.items():
+        for mode, r in by_mode.items():
+            base = baseline.get(service, {}).get(mode)
+            if not base:
+                continue
+            for metric in ("p50_us", "cpu_us_per_request"):
+                if r[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(f"{service}/{mode} {metric}: {base[metric]:.0f} -> {r[metric]:.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", default=SERVICES, choices=SERVICES)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--alloc-requests", type=int, default=200)
+    parser.add_argument("--save", help="grava os resultados como baseline em JSON")
+    parser.add_argument("--baseline", help="compara com um baseline salvo e falha em caso de regressão")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.requests, args.warmup, args.alloc_requests)))
+        return 0
+
+    sink = _start_server(OTLPSinkHandler)
+    sink_endpoint = f"http://127.0.0.1:{sink.server_address[1]}/v1/traces"
+
+    results = {}
+    for service in args.services:
+        results[service] = {}
+        for mode in args.modes:
+            print(f"Executando {service}/{mode}...", file=sys.stderr)
+            results[service][mode] = run_case(service, mode, args, sink_endpoint)
+
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline salvo em {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressões de overhead detectadas:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nSem regressões em relação ao baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import os
+import hmac
 import requests
 import datetime
 from flask import Blueprint, request, jsonify, session
@@ -11,6 +13,12 @@ cart_bp = Blueprint('cart', __name__, url_prefix='/cart')
 
 PRODUCTS_API_URL = "http://products:5001/products"
 
+# Token compartilhado para chamadas internas entre serviços (não passam pelo gateway).
+# Sem token configurado a API interna recusa todas as chamadas.
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
+if not INTERNAL_API_TOKEN:
+    print("[WARN] INTERNAL_API_TOKEN não definido: a API interna do carrinho está desabilitada")
+
 # ===============================================================
 # Cache local simples
 # ===============================================================
@@ -142,6 +150,42 @@ def clear_cart():
         return jsonify({"error": "Falha ao limpar o carrinho", "details": str(e)}), 500
 
 
+# ===============================================================
+# CLEAR CARTS (API interna, limpeza em lote)
+# ===============================================================
+def is_internal_request():
+    token = request.headers.get("X-Internal-Token", "")
+    return bool(INTERNAL_API_TOKEN) and hmac.compare_digest(token, INTERNAL_API_TOKEN)
+
+
+@cart_bp.route('/internal/clear', methods=['POST'])
+def clear_carts_internal():
+    if not is_internal_request():
+        return jsonify({"error": "Acesso negado"}), 403
+
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids')
+    cart_item_ids = data.get('cart_item_ids')
+    if not user_ids or not cart_item_ids:
+        return jsonify({"error": "Corpo da requisição deve conter as listas 'user_ids' e 'cart_item_ids'"}), 400
+
+    span = trace.get_current_span()
+    span.set_attribute("batch.request.size", len(user_ids))
+    span.set_attribute("cart.items.requested", len(cart_item_ids))
+
+    # Só os itens comprados (por id); o filtro por usuário impede apagar itens de terceiros
+    try:
+        deleted = CartItem.query.filter(
+            CartItem.id.in_(cart_item_ids), CartItem.user_id.in_(user_ids)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        span.set_attribute("cart.items.deleted", deleted)
+        return jsonify({"message": "Itens removidos dos carrinhos", "cleared": user_ids, "deleted": deleted}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Falha ao limpar os carrinhos", "details": str(e)}), 500
+
+
 # ===============================================================
 # GET CART (agora com cache local)
 # ===============================================================
@@ -1,7 +1,7 @@
 from flask import Flask 
 from routes.checkout import checkout_bp
 from flask_cors import CORS 
-from telemetry import configure_telemetry
+from shared.telemetry import configure_telemetry
 
 app = Flask(__name__)
 
@@ -1,5 +1,8 @@
+import os
+
 from flask import Blueprint, jsonify, request
 import requests
+from shared.idempotency import idempotent
 
 from opentelemetry import trace
 
@@ -10,7 +13,40 @@ checkout_bp = Blueprint('checkout', __name__, url_prefix='/checkout')
 PRODUCTS_API_URL = "http://products:5001/products/"
 ORDERS_API_URL = "http://orders:5002/orders/"
 
+# Máximo de itens do carrinho registrados nos atributos do span
+SPAN_MAX_ITEMS = int(os.getenv("CHECKOUT_SPAN_MAX_ITEMS", 20))
+
+
+def _numeric_array(values, integral=True):
+    """
+    Array homogêneo para um atributo do span sem truncar nem falhar: inteiros
+    se todos os valores forem inteiros (e `integral`), senão floats; valores
+    não numéricos viram strings em vez de derrubar a requisição.
+    """
+    try:
+        numbers = [float(v) for v in values]
+    except (TypeError, ValueError):
+        return [str(v) for v in values]
+    if integral and all(n.is_integer() for n in numbers):
+        return [int(n) for n in numbers]
+    return numbers
+
+
+def set_cart_attributes(span, order_items):
+    """
+    Registra os itens do carrinho em atributos de chave fixa (arrays paralelos
+    limitados a SPAN_MAX_ITEMS), evitando uma chave nova por produto.
+    """
+    recorded = order_items[:SPAN_MAX_ITEMS]
+    span.set_attribute("checkout.items.count", len(order_items))
+    span.set_attribute("checkout.items.truncated", len(order_items) > SPAN_MAX_ITEMS)
+    span.set_attribute("checkout.items.product_ids", _numeric_array([item["product_id"] for item in recorded]))
+    span.set_attribute("checkout.items.quantities", _numeric_array([item["quantity"] for item in recorded]))
+    span.set_attribute("checkout.items.prices", _numeric_array([item["price"] for item in recorded], integral=False))
+
+
 @checkout_bp.route('/', methods=['POST'])
+@idempotent
 def process_checkout():
     data = request.json
     user_id = data.get('user_id')
@@ -35,15 +71,15 @@ def process_checkout():
             price = product_data.get('price')
             total += price * item['quantity']
 
-            span.set_attribute(f"product.{item['product_id']}.price:", price)
-            span.set_attribute(f"product.{item['product_id']}.quantity", item['quantity'])
-
             order_items_payload.append({
-                "product_id": item['product_id'], "quantity": item['quantity'], "price": price
+                "product_id": item['product_id'], "quantity": item['quantity'], "price": price,
+                "cart_item_id": item.get('id')  # limpeza do carrinho restrita aos itens pagos
             })
         except requests.exceptions.RequestException:
             return jsonify({"error": "Erro de comunicação com o serviço de produtos"}), 503
 
+    set_cart_attributes(span, order_items_payload)
+
     # 2. Criar o pedido com status 'pending'
     if total > 0:
         span.set_attribute("total", total)
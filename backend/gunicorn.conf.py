@@ -0,0 +1,46 @@
+# Configuração do gunicorn compartilhada por todos os serviços Flask.
+# Todos os parâmetros podem ser ajustados por variáveis de ambiente no Deployment.
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Workers x threads (gthread): I/O bound, a maior parte do tempo é espera por HTTP/banco
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = _env_int("GUNICORN_WORKERS", 2)
+threads = _env_int("GUNICORN_THREADS", 8)
+
+# Carrega a aplicação no master antes do fork (startup mais rápido, menos memória)
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+# Encerramento gracioso e reciclagem de workers (contém vazamentos de memória)
+timeout = _env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 20)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 5000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 500)
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Com preload, o pool de conexões do SQLAlchemy foi criado no master e não
+    # pode ser compartilhado entre processos: cada worker abre o seu.
+    if not preload_app:
+        return
+    try:
+        from app import app
+        from database import db
+    except ImportError:
+        return  # serviço sem banco de dados (checkout, payment)
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,3 @@
+# Código compartilhado pelos serviços Flask. As imagens copiam backend/lib
+# para /srv/lib e usam PYTHONPATH=/srv/lib; fora do Docker, rode os serviços
+# com PYTHONPATH=<repo>/backend/lib.
@@ -0,0 +1,284 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, make_response, request
+from opentelemetry import trace
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "sqlite")               # sqlite | memory
+IDEMPOTENCY_PATH = os.getenv("IDEMPOTENCY_PATH", "instance/idempotency.db")
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 600))   # 10 minutos
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", 10000))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10))  # espera por requisição em andamento
+IDEMPOTENCY_POLL_SECONDS = 0.05
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires_at", "done", "response", "token")
+
+    def __init__(self, fingerprint, expires_at, token=None):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.done = threading.Event()
+        self.response = None
+        self.token = token
+
+
+# ===============================================================
+# Armazenamento em SQLite (compartilhado pelos workers do pod)
+# ===============================================================
+class SQLiteIdempotencyStore:
+    """
+    Respostas por chave num arquivo SQLite com chave primária única: os
+    workers do gunicorn no mesmo pod disputam a chave numa transação, então
+    uma repetição que cai em outro worker recebe a resposta armazenada.
+    Réplicas diferentes do serviço não compartilham o arquivo.
+    """
+
+    def __init__(self, path=IDEMPOTENCY_PATH, max_entries=IDEMPOTENCY_MAX_ENTRIES, ttl_seconds=IDEMPOTENCY_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_key (
+                key TEXT PRIMARY KEY,
+                token TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                status INTEGER,
+                content_type TEXT,
+                body BLOB
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_idempotency_expires ON idempotency_key (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_idempotency_created ON idempotency_key (created_at)")
+
+    def _conn(self):
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_connections(self):
+        """Descarta conexões herdadas após um fork"""
+        self._local = threading.local()
+
+    @staticmethod
+    def _entry(row):
+        token, fingerprint, expires_at, status, content_type, body = row
+        entry = _Entry(fingerprint, expires_at, token)
+        if status is not None:
+            entry.response = (body, status, content_type)
+            entry.done.set()
+        return entry
+
+    def begin(self, key, fingerprint):
+        """Retorna (entrada, True) se esta requisição deve executar o pipeline"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT token, fingerprint, expires_at, status, content_type, body FROM idempotency_key WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is not None and row[2] > now:
+                conn.execute("COMMIT")
+                return self._entry(row), False
+
+            entry = _Entry(fingerprint, now + self.ttl_seconds, uuid.uuid4().hex)
+            conn.execute("DELETE FROM idempotency_key WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_key (key, token, fingerprint, expires_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, entry.token, fingerprint, entry.expires_at, now)
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM idempotency_key").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM idempotency_key WHERE key IN "
+                    "(SELECT key FROM idempotency_key ORDER BY created_at LIMIT ?)",
+                    (excess,)
+                )
+            conn.execute("COMMIT")
+            return entry, True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, key, entry, response):
+        """Guarda a resposta; `None` descarta a chave para permitir nova tentativa"""
+        conn = self._conn()
+        if response is None:
+            conn.execute("DELETE FROM idempotency_key WHERE key = ? AND token = ?", (key, entry.token))
+        else:
+            body, status, content_type = response
+            conn.execute(
+                "UPDATE idempotency_key SET status = ?, content_type = ?, body = ? WHERE key = ? AND token = ?",
+                (status, content_type, body, key, entry.token)
+            )
+        entry.response = response
+        entry.done.set()
+
+    def wait(self, key, entry, timeout):
+        """(concluída, resposta) da execução em andamento de outro worker"""
+        deadline = time.monotonic() + timeout
+        conn = self._conn()
+        while True:
+            row = conn.execute(
+                "SELECT token, status, content_type, body FROM idempotency_key WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] != entry.token:
+                return True, None   # a execução original falhou e liberou a chave
+            if row[1] is not None:
+                return True, (row[3], row[1], row[2])
+            if time.monotonic() >= deadline:
+                return False, None
+            time.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+
+# ===============================================================
+# Armazenamento em memória (um único processo)
+# ===============================================================
+class IdempotencyCache:
+    """
+    Cache LRU limitado e com expiração das respostas já produzidas por chave.
+    Vale só dentro do processo: com mais de um worker do gunicorn uma
+    repetição pode cair em outro worker e executar de novo (use o SQLite).
+    """
+
+    def __init__(self, max_entries=IDEMPOTENCY_MAX_ENTRIES, ttl_seconds=IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key, fingerprint):
+        """Retorna (entrada, True) se esta requisição deve executar o pipeline"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                return entry, False
+
+            entry = _Entry(fingerprint, now + self.ttl_seconds)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry, True
+
+    def complete(self, key, entry, response):
+        """Guarda a resposta; `None` descarta a chave para permitir nova tentativa"""
+        with self._lock:
+            if response is None and self._entries.get(key) is entry:
+                del self._entries[key]
+            entry.response = response
+        entry.done.set()
+
+    def wait(self, key, entry, timeout):
+        """(concluída, resposta) da execução em andamento de outra thread"""
+        return entry.done.wait(timeout), entry.response
+
+
+def create_store():
+    if IDEMPOTENCY_BACKEND == "memory":
+        return IdempotencyCache()
+    store = SQLiteIdempotencyStore(IDEMPOTENCY_PATH)
+    # Conexões abertas antes do fork (gunicorn com preload) não podem ser reutilizadas
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=store.reset_connections)
+    return store
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Cria o armazenamento na primeira requisição idempotente do processo"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
+
+
+def _fingerprint():
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+
+def _replay(response):
+    body, status, content_type = response
+    resp = make_response(body, status)
+    resp.headers["Content-Type"] = content_type
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+
+def idempotent(view):
+    """
+    Executa a view uma única vez por Idempotency-Key (escopo: rota + user_id).
+    Repetições recebem a resposta armazenada; respostas 5xx não são
+    armazenadas para que o cliente possa tentar novamente.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+
+        store = get_store()
+        span = trace.get_current_span()
+        payload = request.get_json(silent=True) or {}
+        cache_key = f"{request.path}:{payload.get('user_id')}:{key}"
+        fingerprint = _fingerprint()
+
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            entry, owner = store.begin(cache_key, fingerprint)
+            if owner:
+                break
+
+            if entry.fingerprint != fingerprint:
+                return jsonify({"error": "Idempotency-Key já utilizada com outro corpo de requisição"}), 422
+            done, response = store.wait(cache_key, entry, max(deadline - time.monotonic(), 0))
+            if not done:
+                return jsonify({"error": "Requisição com a mesma Idempotency-Key em andamento"}), 409
+            if response is not None:
+                span.set_attribute("idempotency.replayed", True)
+                return _replay(response)
+            # A execução original falhou sem resposta armazenável: tenta de novo
+
+        span.set_attribute("idempotency.replayed", False)
+        try:
+            resp = make_response(view(*args, **kwargs))
+        except Exception:
+            store.complete(cache_key, entry, None)
+            raise
+
+        if resp.status_code >= 500:
+            store.complete(cache_key, entry, None)
+        else:
+            store.complete(cache_key, entry, (resp.get_data(), resp.status_code, resp.content_type))
+        return resp
+
+    return wrapper
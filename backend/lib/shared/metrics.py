@@ -0,0 +1,113 @@
+import os
+import time
+
+from flask import Flask, g, request
+from opentelemetry import metrics
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.view import DropAggregation, ExplicitBucketHistogramAggregation, View
+
+
+# ===============================================================
+# Configuração (via ENV)
+# ===============================================================
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+METRICS_EXPORTER = os.getenv("OTEL_METRICS_EXPORTER", "otlp").lower()  # otlp | none
+METRICS_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_METRICS_ENDPOINT", "http://collector:4321/v1/metrics")
+METRIC_EXPORT_INTERVAL_MILLIS = _env_int("OTEL_METRIC_EXPORT_INTERVAL", 15000)
+METRIC_EXPORT_TIMEOUT_MILLIS = _env_int("OTEL_METRIC_EXPORT_TIMEOUT", 10000)
+
+# Limites dos buckets de latência, em segundos
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10]
+
+# Atributos mantidos nas métricas de chamadas para outros serviços (uma série por upstream)
+CLIENT_ATTRIBUTES = {"http.method", "http.status_code", "net.peer.name", "server.address", "http.request.method", "http.response.status_code"}
+
+
+def metrics_enabled():
+    return METRICS_EXPORTER != "none"
+
+
+def build_meter_provider(resource):
+    """
+    MeterProvider com agregação em processo: o coletor recebe apenas os
+    histogramas e contadores já agregados a cada intervalo de exportação.
+    """
+    reader = PeriodicExportingMetricReader(
+        OTLPMetricExporter(endpoint=METRICS_ENDPOINT, timeout=METRIC_EXPORT_TIMEOUT_MILLIS / 1000),
+        export_interval_millis=METRIC_EXPORT_INTERVAL_MILLIS,
+        export_timeout_millis=METRIC_EXPORT_TIMEOUT_MILLIS,
+    )
+    views = [
+        # As métricas de servidor do FlaskInstrumentor usam host/porta como atributo;
+        # as métricas por rota são registradas por instrument_red_metrics
+        View(meter_name="opentelemetry.instrumentation.flask", aggregation=DropAggregation()),
+        View(
+            instrument_name="http.client.duration",
+            attribute_keys=CLIENT_ATTRIBUTES,
+            aggregation=ExplicitBucketHistogramAggregation([b * 1000 for b in DURATION_BUCKETS]),  # em ms
+        ),
+    ]
+    return MeterProvider(resource=resource, metric_readers=[reader], views=views)
+
+
+# ===============================================================
+# Métricas RED por rota (rate, errors, duration)
+# ===============================================================
+def instrument_red_metrics(app: Flask, meter_provider):
+    """
+    Registra duração e erros de cada requisição com atributos de baixa
+    cardinalidade: o template da rota (ex.: /products/<int:product_id>),
+    o método e o status. A taxa de requisições é a contagem do histograma.
+    """
+    meter = meter_provider.get_meter(__name__)
+    duration = meter.create_histogram(
+        "http.server.request.duration", unit="s", description="Duração das requisições HTTP por rota",
+        explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+    )
+    errors = meter.create_counter(
+        "http.server.request.errors", unit="{request}", description="Requisições HTTP com status 5xx por rota"
+    )
+
+    @app.before_request
+    def _start_timer():
+        g._red_start = time.perf_counter()
+
+    @app.after_request
+    def _record_status(response):
+        g._red_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _record_request(exc):
+        start = g.pop("_red_start", None)
+        if start is None:
+            return
+        # Sem after_request (exceção não tratada) a resposta é 500
+        status = g.pop("_red_status", 500)
+        attributes = {
+            "http.route": request.url_rule.rule if request.url_rule else "unmatched",
+            "http.request.method": request.method,
+            "http.response.status_code": status,
+        }
+        duration.record(time.perf_counter() - start, attributes)
+        if status >= 500:
+            errors.add(1, attributes)
+
+
+def configure_metrics(app: Flask, resource):
+    """Cria o MeterProvider global e as métricas RED do app; retorna o provider (ou None)"""
+    if not metrics_enabled():
+        return None
+
+    meter_provider = build_meter_provider(resource)
+    metrics.set_meter_provider(meter_provider)
+    instrument_red_metrics(app, meter_provider)
+    return meter_provider
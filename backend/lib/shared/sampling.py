@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_ON,
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import SpanContext, StatusCode, TraceFlags, get_current_span
+
+
+# ===============================================================
+# Configuração (via ENV)
+# ===============================================================
+# always_on                -> comportamento anterior: todo span é exportado
+# parentbased_traceidratio -> head sampling clássico pela fração OTEL_TRACES_SAMPLER_ARG
+# parentbased_hybrid       -> head sampling + traces com erro ou lentos sempre exportados
+TRACES_SAMPLER = os.getenv("OTEL_TRACES_SAMPLER", "always_on").lower()
+try:
+    TRACES_SAMPLER_ARG = float(os.getenv("OTEL_TRACES_SAMPLER_ARG", 1.0))
+except ValueError:
+    TRACES_SAMPLER_ARG = 1.0
+HYBRID_SLOW_MS = float(os.getenv("OTEL_HYBRID_SLOW_MS", 500))
+HYBRID_MAX_TRACES = int(os.getenv("OTEL_HYBRID_MAX_TRACES", 2048))
+
+# W3C Trace Context nível 2: o serviço chamado devolve a decisão de amostragem
+TRACERESPONSE_HEADER = "traceresponse"
+
+
+# ===============================================================
+# Samplers
+# ===============================================================
+class RecordOnlySampler(Sampler):
+    """Grava o span (atributos, status, duração) sem marcá-lo como amostrado"""
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        parent_state = get_current_span(parent_context).get_span_context().trace_state
+        return SamplingResult(Decision.RECORD_ONLY, None, parent_state)
+
+    def get_description(self):
+        return "RecordOnlySampler"
+
+
+class HybridRatioSampler(Sampler):
+    """
+    Amostra a fração `rate` dos traces pelo traceID; os demais ficam apenas
+    gravados localmente para que LocalTailSpanProcessor possa resgatá-los.
+    """
+
+    def __init__(self, rate):
+        self._ratio = TraceIdRatioBased(rate)
+        self._record_only = RecordOnlySampler()
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        result = self._ratio.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if result.decision == Decision.RECORD_AND_SAMPLE:
+            return result
+        return self._record_only.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+
+    def get_description(self):
+        return f"HybridRatioSampler{{{self._ratio.rate}}}"
+
+
+def build_sampler():
+    if TRACES_SAMPLER == "parentbased_traceidratio":
+        return ParentBased(TraceIdRatioBased(TRACES_SAMPLER_ARG))
+    if TRACES_SAMPLER == "parentbased_hybrid":
+        record_only = RecordOnlySampler()
+        return ParentBased(
+            root=HybridRatioSampler(TRACES_SAMPLER_ARG),
+            remote_parent_not_sampled=record_only,
+            local_parent_not_sampled=record_only,
+        )
+    if TRACES_SAMPLER != "always_on":
+        print(f"[WARN] OTEL_TRACES_SAMPLER desconhecido '{TRACES_SAMPLER}', usando always_on")
+    return ALWAYS_ON
+
+
+def is_hybrid():
+    return TRACES_SAMPLER == "parentbased_hybrid"
+
+
+# ===============================================================
+# Decisão local no fim do trace (modo híbrido)
+# ===============================================================
+def _as_sampled(span):
+    """Cópia do span marcada como amostrada, para o BatchSpanProcessor aceitá-la"""
+    ctx = span.context
+    sampled_ctx = SpanContext(
+        ctx.trace_id, ctx.span_id, ctx.is_remote,
+        TraceFlags(TraceFlags.SAMPLED), ctx.trace_state
+    )
+    return ReadableSpan(
+        name=span.name,
+        context=sampled_ctx,
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class LocalTailSpanProcessor(SpanProcessor):
+    """
+    Spans amostrados seguem direto para `delegate`. Spans apenas gravados
+    ficam num buffer por trace até a raiz local (span sem pai ou com pai
+    remoto) terminar; o fragmento é exportado se algum span teve erro ou se
+    a requisição passou de `slow_ms`, e descartado caso contrário.
+
+    Para não exportar fragmentos órfãos, a decisão sobe pela cadeia de
+    chamadas: um serviço chamado decide ao montar a resposta (decide()) e a
+    devolve no cabeçalho traceresponse; o chamador marca o trace (mark_keep())
+    e o mantém também, repassando a decisão ao seu próprio chamador.
+    Fragmentos com pai remoto só são exportados se a decisão foi devolvida.
+    Limitação: subárvores de serviços chamados que terminaram bem antes da
+    decisão do chamador já foram descartadas e faltam no trace resgatado.
+    """
+
+    def __init__(self, delegate, slow_ms=HYBRID_SLOW_MS, max_traces=HYBRID_MAX_TRACES):
+        self._delegate = delegate
+        self._slow_ns = slow_ms * 1e6
+        self._max_traces = max_traces
+        self._pending = OrderedDict()
+        self._keep_ids = OrderedDict()  # traces já decididos como mantidos
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        self._delegate.on_start(span, parent_context=parent_context)
+
+    def mark_keep(self, trace_id):
+        """Mantém o fragmento local deste trace (decisão própria ou de um serviço chamado)"""
+        with self._lock:
+            self._keep_ids[trace_id] = True
+            self._keep_ids.move_to_end(trace_id)
+            while len(self._keep_ids) > self._max_traces:
+                self._keep_ids.popitem(last=False)
+
+    def decide(self, local_root, status_code=None):
+        """Decisão antes da resposta sair: erro, lentidão ou trace já marcado"""
+        trace_id = local_root.context.trace_id
+        with self._lock:
+            keep = trace_id in self._keep_ids
+            spans = list(self._pending.get(trace_id, ()))
+        keep = (
+            keep
+            or (status_code is not None and status_code >= 500)
+            or any(s.status.status_code == StatusCode.ERROR for s in spans)
+            or time.time_ns() - (local_root.start_time or 0) >= self._slow_ns
+        )
+        if keep:
+            self.mark_keep(trace_id)
+        return keep
+
+    def on_end(self, span):
+        if span.context.trace_flags.sampled:
+            self._delegate.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._pending.setdefault(trace_id, [])
+            spans.append(span)
+            if is_local_root:
+                del self._pending[trace_id]
+                marked = self._keep_ids.pop(trace_id, False)
+            else:
+                # Limita a memória: descarta os traces incompletos mais antigos
+                self._pending.move_to_end(trace_id)
+                while len(self._pending) > self._max_traces:
+                    self._pending.popitem(last=False)
+                return
+
+        # Com pai remoto, só a decisão devolvida ao chamador garante que o pai também é exportado
+        keep = marked or (span.parent is None and self._keep(span, spans))
+        if keep:
+            for s in spans:
+                self._delegate.on_end(_as_sampled(s))
+
+    def _keep(self, local_root, spans):
+        if any(s.status.status_code == StatusCode.ERROR for s in spans):
+            return True
+        duration = (local_root.end_time or 0) - (local_root.start_time or 0)
+        return duration >= self._slow_ns
+
+    def shutdown(self):
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self._delegate.force_flush(timeout_millis)
+
+
+_local_tail = None  # processador do modo híbrido, usado pelos hooks de propagação
+
+
+def wrap_span_processor(processor):
+    """Aplica a decisão local no fim do trace quando o modo híbrido está ativo"""
+    global _local_tail
+    if is_hybrid():
+        _local_tail = LocalTailSpanProcessor(processor)
+        return _local_tail
+    return processor
+
+
+def traceresponse_after_request(response):
+    """after_request do Flask: devolve ao chamador a decisão de manter o trace"""
+    span = get_current_span()
+    ctx = span.get_span_context()
+    if _local_tail is None or not ctx.is_valid or ctx.trace_flags.sampled or not isinstance(span, ReadableSpan):
+        return response
+    if _local_tail.decide(span, response.status_code):
+        response.headers[TRACERESPONSE_HEADER] = f"00-{ctx.trace_id:032x}-{ctx.span_id:016x}-01"
+    return response
+
+
+def traceresponse_hook(span, request, response):
+    """response_hook do requests: o serviço chamado manteve o seu fragmento"""
+    if _local_tail is None or response is None:
+        return
+    parts = response.headers.get(TRACERESPONSE_HEADER, "").split("-")
+    if len(parts) != 4:
+        return
+    try:
+        trace_id, flags = int(parts[1], 16), int(parts[3], 16)
+    except ValueError:
+        return
+    ctx = span.get_span_context()
+    if flags & TraceFlags.SAMPLED and trace_id == ctx.trace_id:
+        _local_tail.mark_keep(trace_id)
@@ -0,0 +1,222 @@
+import os
+import platform
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanLimits, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.exporter.otlp.proto.http import Compression
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.flask import FlaskInstrumentor
+from opentelemetry.instrumentation.requests import RequestsInstrumentor
+from shared.metrics import configure_metrics
+from shared.sampling import build_sampler, is_hybrid, traceresponse_after_request, traceresponse_hook, wrap_span_processor
+
+
+# ===============================================================
+# Configuração (via ENV, ajustável por serviço no Deployment)
+# ===============================================================
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+SDK_DISABLED = os.getenv("OTEL_SDK_DISABLED", "false").lower() == "true"
+TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "otlp").lower()  # otlp | none
+
+TRACES_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", "http://collector:4321/v1/traces")
+EXPORT_TIMEOUT_SECONDS = _env_int("OTEL_EXPORTER_OTLP_TRACES_TIMEOUT", 10)
+EXPORT_COMPRESSION = os.getenv("OTEL_EXPORTER_OTLP_TRACES_COMPRESSION", "none")  # none | gzip | deflate
+EXPORT_HTTP_RETRIES = _env_int("OTEL_EXPORTER_OTLP_HTTP_RETRIES", 0)
+
+BSP_MAX_QUEUE_SIZE = _env_int("OTEL_BSP_MAX_QUEUE_SIZE", 2048)
+BSP_MAX_EXPORT_BATCH_SIZE = _env_int("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", 512)
+BSP_SCHEDULE_DELAY_MILLIS = _env_int("OTEL_BSP_SCHEDULE_DELAY", 5000)
+BSP_EXPORT_TIMEOUT_MILLIS = _env_int("OTEL_BSP_EXPORT_TIMEOUT", 30000)
+
+# Limites por span: mantêm o tamanho do span constante mesmo com atributos por item
+SPAN_ATTRIBUTE_COUNT_LIMIT = _env_int("OTEL_SPAN_ATTRIBUTE_COUNT_LIMIT", 64)
+SPAN_ATTRIBUTE_VALUE_LENGTH_LIMIT = _env_int("OTEL_SPAN_ATTRIBUTE_VALUE_LENGTH_LIMIT", 256)
+SPAN_EVENT_COUNT_LIMIT = _env_int("OTEL_SPAN_EVENT_COUNT_LIMIT", 32)
+SPAN_LINK_COUNT_LIMIT = _env_int("OTEL_SPAN_LINK_COUNT_LIMIT", 128)
+EVENT_ATTRIBUTE_COUNT_LIMIT = _env_int("OTEL_EVENT_ATTRIBUTE_COUNT_LIMIT", 16)
+
+
+# ===============================================================
+# Contadores de spans perdidos
+# ===============================================================
+class _Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+
+dropped_spans = _Counter()        # descartados por fila cheia no BatchSpanProcessor
+failed_export_spans = _Counter()  # perdidos em exportações que falharam
+
+
+class CountingBatchSpanProcessor(BatchSpanProcessor):
+    """BatchSpanProcessor que contabiliza os spans descartados por fila cheia"""
+
+    def on_end(self, span):
+        if span.context.trace_flags.sampled and self._queue_full():
+            dropped_spans.add()
+        super().on_end(span)
+
+    def _queue_full(self):
+        # SDK >= 1.28 delega a fila para um BatchProcessor interno
+        impl = getattr(self, "_batch_processor", self)
+        queue = getattr(impl, "_queue", None)
+        if queue is None:
+            queue = getattr(impl, "queue", ())
+        max_size = getattr(impl, "_max_queue_size", None) or getattr(impl, "max_queue_size", 0)
+        return max_size > 0 and len(queue) >= max_size
+
+
+class CountingSpanExporter(SpanExporter):
+    """Delega para o exportador real e contabiliza spans de lotes que falharam"""
+
+    def __init__(self, exporter):
+        self._exporter = exporter
+
+    def export(self, spans):
+        try:
+            result = self._exporter.export(spans)
+        except Exception:
+            failed_export_spans.add(len(spans))
+            raise
+        if result != SpanExportResult.SUCCESS:
+            failed_export_spans.add(len(spans))
+        return result
+
+    def shutdown(self):
+        return self._exporter.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self._exporter.force_flush(timeout_millis)
+
+
+class NoOpSpanExporter(SpanExporter):
+    """Descarta os spans; mede o custo da instrumentação sem o custo de rede"""
+
+    def export(self, spans):
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def telemetry_stats():
+    return {
+        "dropped_spans": dropped_spans.value,
+        "failed_export_spans": failed_export_spans.value,
+    }
+
+
+# ===============================================================
+# Pipeline de exportação
+# ===============================================================
+def _compression():
+    try:
+        return Compression(EXPORT_COMPRESSION.lower())
+    except ValueError:
+        print(f"[WARN] Compressão OTLP desconhecida '{EXPORT_COMPRESSION}', usando 'none'")
+        return Compression.NoCompression
+
+
+def _http_session():
+    # Sem backoff bloqueante por padrão: o BatchSpanProcessor já reenvia no próximo lote
+    session = requests.Session()
+    if EXPORT_HTTP_RETRIES > 0:
+        retry_strategy = Retry(
+            total=EXPORT_HTTP_RETRIES,
+            backoff_factor=0.1,
+            status_forcelist=[500, 502, 503, 504],
+        )
+        adapter = HTTPAdapter(max_retries=retry_strategy)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    return session
+
+
+def build_span_limits():
+    # Valores de array contam como um único atributo; o limite de tamanho vale por elemento
+    return SpanLimits(
+        max_span_attributes=SPAN_ATTRIBUTE_COUNT_LIMIT,
+        max_attribute_length=SPAN_ATTRIBUTE_VALUE_LENGTH_LIMIT,
+        max_events=SPAN_EVENT_COUNT_LIMIT,
+        max_links=SPAN_LINK_COUNT_LIMIT,
+        max_event_attributes=EVENT_ATTRIBUTE_COUNT_LIMIT,
+    )
+
+
+def build_span_processor():
+    if TRACES_EXPORTER == "none":
+        exporter = NoOpSpanExporter()
+    else:
+        exporter = OTLPSpanExporter(
+            endpoint=TRACES_ENDPOINT,
+            timeout=EXPORT_TIMEOUT_SECONDS,
+            compression=_compression(),
+            session=_http_session()
+        )
+    return CountingBatchSpanProcessor(
+        CountingSpanExporter(exporter),
+        max_queue_size=BSP_MAX_QUEUE_SIZE,
+        schedule_delay_millis=BSP_SCHEDULE_DELAY_MILLIS,
+        max_export_batch_size=BSP_MAX_EXPORT_BATCH_SIZE,
+        export_timeout_millis=BSP_EXPORT_TIMEOUT_MILLIS,
+    )
+
+
+def configure_telemetry(app: Flask, service_name: str, db=None):
+    """
+    Configura traces e métricas para um serviço Flask. Se `db` (Flask-SQLAlchemy)
+    for informado, as queries também são instrumentadas.
+    """
+    if SDK_DISABLED:
+        print(f"OpenTelemetry desativado (OTEL_SDK_DISABLED) para o serviço: {service_name}")
+        return
+
+    resource = Resource(attributes={
+        "service.name": service_name,
+        "service.instance.id": platform.node(),
+    })
+
+    # Head sampling no SDK (OTEL_TRACES_SAMPLER); complementa o tail sampling do coletor
+    tracer_provider = TracerProvider(resource=resource, sampler=build_sampler(), span_limits=build_span_limits())
+    trace.set_tracer_provider(tracer_provider)
+    tracer_provider.add_span_processor(wrap_span_processor(build_span_processor()))
+
+    # Métricas RED (por rota e por upstream) exportadas via OTLP junto com os traces
+    meter_provider = configure_metrics(app, resource)
+
+    FlaskInstrumentor().instrument_app(app, meter_provider=meter_provider)
+    if is_hybrid():
+        # Propaga a decisão do modo híbrido entre serviços (cabeçalho traceresponse)
+        app.after_request(traceresponse_after_request)
+        RequestsInstrumentor().instrument(meter_provider=meter_provider, response_hook=traceresponse_hook)
+    else:
+        RequestsInstrumentor().instrument(meter_provider=meter_provider)
+
+    if db is not None:
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+        with app.app_context():
+            SQLAlchemyInstrumentor().instrument(engine=db.engine)
+
+    print(f"OpenTelemetry configurado com sucesso para o serviço: {service_name}")
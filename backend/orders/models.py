@@ -5,6 +5,7 @@ class OrderItem(db.Model):
     product_id = db.Column(db.Integer, nullable = False)
     quantity = db.Column(db.Float, nullable=False)
     price = db.Column(db.Float, nullable=False)
+    cart_item_id = db.Column(db.Integer, nullable=True)  # item do carrinho que originou o pedido
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key = True)
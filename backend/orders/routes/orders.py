@@ -82,7 +82,8 @@ def create_order():
             order_id=order.id,
             product_id=item_data['product_id'],
             quantity=item_data['quantity'],
-            price=item_data['price']
+            price=item_data['price'],
+            cart_item_id=item_data.get('cart_item_id')
         )
         db.session.add(order_item)
 
@@ -176,6 +177,45 @@ def confirm_payment(order_id):
     return jsonify({"message": "Pagamento do pedido confirmado com sucesso"}), 200
 
 
+# ===============================================================
+# CONFIRM PAYMENT (lote, usado pelo outbox do serviço de pagamento)
+# ===============================================================
+@orders_bp.route('/confirm_payment', methods=['POST'])
+def confirm_payment_batch():
+    span = trace.get_current_span()
+
+    data = request.get_json(silent=True) or {}
+    order_ids = data.get('order_ids')
+    if not order_ids:
+        return jsonify({"error": "Corpo da requisição deve conter uma lista 'order_ids'"}), 400
+    span.set_attribute("batch.request.size", len(order_ids))
+
+    # O frontend envia o id da URL como string
+    valid_ids = [int(i) for i in order_ids if str(i).isdigit()]
+
+    found_orders = Order.query.options(joinedload(Order.items)).filter(Order.id.in_(valid_ids)).all()
+    found_ids = [order.id for order in found_orders]
+    if found_ids:
+        Order.query.filter(Order.id.in_(found_ids)).update({"status": "paid"}, synchronize_session=False)
+        db.session.commit()
+
+    found = set(found_ids)
+    not_found = [i for i in order_ids if not str(i).isdigit() or int(i) not in found]
+    span.set_attribute("batch.response.size", len(found_ids))
+    span.set_attribute("payment.status", "paid")
+
+    # Itens do carrinho de cada pedido: o pagamento limpa só o que foi comprado
+    carts = [
+        {
+            "order_id": order.id,
+            "user_id": order.user_id,
+            "cart_item_ids": [item.cart_item_id for item in order.items if item.cart_item_id is not None],
+        }
+        for order in found_orders
+    ]
+    return jsonify({"confirmed": found_ids, "not_found": not_found, "carts": carts}), 200
+
+
 # ===============================================================
 # DELETE ORDER
 # ===============================================================
@@ -1,18 +1,13 @@
 from opentelemetry import trace
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.trace.export import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.trace.sampling import TraceIdRationBased
-import os
-
+from opentelemetry.sdk.trace import TracerProvider
+from shared.sampling import build_sampler, wrap_span_processor
+from shared.telemetry import build_span_limits, build_span_processor
 
 
 def traces_provider(resource):
-    traces_endpoint = os.getenv("TRACES_ENDPOINT", "http://collector:4321/v1/traces")
-
-    provider = TracerProvider(resource=resource, sampler=TraceIdRationBased(1.0))
-    processor = BatchSpanProcessor(OTLPSpanExporter(endpoint=traces_endpoint))
-    provider.add_span_processor(processor)
+    # Sampler e exportador configurados por ENV (ver shared.sampling e shared.telemetry)
+    provider = TracerProvider(resource=resource, sampler=build_sampler(), span_limits=build_span_limits())
+    provider.add_span_processor(wrap_span_processor(build_span_processor()))
     trace.set_tracer_provider(provider)
 
-    return trace.get_tracer(provider)
+    return trace.get_tracer(__name__)
@@ -1,11 +1,16 @@
-from flask import Flask 
-from routes.payment import payment_bp
-from telemetry import configure_telemetry
+from flask import Flask
+from routes.payment import payment_bp, outbox, DELIVERY_HANDLERS
+from outbox import OutboxDispatcher
+from shared.telemetry import configure_telemetry
 
 app = Flask(__name__)
 app.register_blueprint(payment_bp)
 
 configure_telemetry(app, "payment")
 
+# Entrega assíncrona de confirmações de pagamento e limpeza de carrinhos
+dispatcher = OutboxDispatcher(outbox, DELIVERY_HANDLERS)
+dispatcher.start()
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5004, debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5004, debug=True)
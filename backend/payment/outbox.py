@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from opentelemetry import trace
+from opentelemetry.propagate import extract
+
+tracer = trace.get_tracer(__name__)
+
+# ===============================================================
+# Configuração (via ENV)
+# ===============================================================
+OUTBOX_BACKEND = os.getenv("OUTBOX_BACKEND", "sqlite")          # sqlite | memory
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "instance/outbox.db")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 0.2))  # segundos
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", 0.5))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", 30))
+
+
+def _backoff(attempts):
+    """Backoff exponencial limitado a 5 minutos"""
+    return min(OUTBOX_BACKOFF_SECONDS * (2 ** (attempts - 1)), 300)
+
+
+# ===============================================================
+# Outbox durável (SQLite local ao pod)
+# ===============================================================
+class SQLiteOutbox:
+    """
+    Fila de eventos persistida em SQLite. O endpoint grava os eventos numa
+    única transação local e o dispatcher os reivindica em lotes com um lease,
+    o que permite vários processos (workers) consumirem o mesmo arquivo.
+    """
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox_event (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox_event (status, next_attempt_at)"
+        )
+
+    def _conn(self):
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_connections(self):
+        """Descarta conexões herdadas após um fork"""
+        self._local = threading.local()
+
+    def add(self, events):
+        """Grava uma lista de (tipo, payload) numa única transação"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO outbox_event (type, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                [(event_type, json.dumps(payload), now, now) for event_type, payload in events]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, limit):
+        """Reivindica até `limit` eventos vencidos (pendentes ou com lease expirado)"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, type, payload, attempts FROM outbox_event "
+                "WHERE status IN ('pending', 'inflight') AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE outbox_event SET status = 'inflight', next_attempt_at = ? WHERE id = ?",
+                    [(now + OUTBOX_LEASE_SECONDS, row[0]) for row in rows]
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return [
+            {"id": row[0], "type": row[1], "payload": json.loads(row[2]), "attempts": row[3]}
+            for row in rows
+        ]
+
+    def ack(self, events):
+        if not events:
+            return
+        self._conn().executemany(
+            "DELETE FROM outbox_event WHERE id = ?", [(e["id"],) for e in events]
+        )
+
+    def retry(self, events, error):
+        if not events:
+            return
+        now = time.time()
+        updates = []
+        for e in events:
+            attempts = e["attempts"] + 1
+            status = "failed" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending"
+            updates.append((status, attempts, now + _backoff(attempts), str(error)[:500], e["id"]))
+        self._conn().executemany(
+            "UPDATE outbox_event SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            updates
+        )
+
+    def pending_count(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM outbox_event WHERE status IN ('pending', 'inflight')"
+        ).fetchone()[0]
+
+
+# ===============================================================
+# Stand-in em memória (testes / desenvolvimento local)
+# ===============================================================
+class MemoryOutbox:
+    """Mesma interface do SQLiteOutbox, sem durabilidade"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+        self._next_id = 1
+
+    def reset_connections(self):
+        pass
+
+    def add(self, events):
+        now = time.time()
+        with self._lock:
+            for event_type, payload in events:
+                self._events[self._next_id] = {
+                    "id": self._next_id, "type": event_type, "payload": payload,
+                    "attempts": 0, "status": "pending", "next_attempt_at": now
+                }
+                self._next_id += 1
+
+    def claim(self, limit):
+        now = time.time()
+        claimed = []
+        with self._lock:
+            for event in self._events.values():
+                if len(claimed) >= limit:
+                    break
+                if event["status"] in ("pending", "inflight") and event["next_attempt_at"] <= now:
+                    event["status"] = "inflight"
+                    event["next_attempt_at"] = now + OUTBOX_LEASE_SECONDS
+                    claimed.append(dict(event))
+        return claimed
+
+    def ack(self, events):
+        with self._lock:
+            for e in events:
+                self._events.pop(e["id"], None)
+
+    def retry(self, events, error):
+        now = time.time()
+        with self._lock:
+            for e in events:
+                event = self._events.get(e["id"])
+                if not event:
+                    continue
+                event["attempts"] += 1
+                event["status"] = "failed" if event["attempts"] >= OUTBOX_MAX_ATTEMPTS else "pending"
+                event["next_attempt_at"] = now + _backoff(event["attempts"])
+                event["last_error"] = str(error)
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for e in self._events.values() if e["status"] in ("pending", "inflight"))
+
+
+def create_outbox():
+    if OUTBOX_BACKEND == "memory":
+        return MemoryOutbox()
+    return SQLiteOutbox(OUTBOX_PATH)
+
+
+# ===============================================================
+# Dispatcher em background
+# ===============================================================
+class OutboxDispatcher:
+    """
+    Entrega os eventos do outbox em lotes. `handlers` mapeia o tipo do evento
+    para uma função que recebe a lista de eventos e retorna os que foram
+    entregues; os demais voltam para a fila com backoff.
+    """
+
+    def __init__(self, outbox, handlers, batch_size=OUTBOX_BATCH_SIZE, poll_interval=OUTBOX_POLL_INTERVAL):
+        self.outbox = outbox
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._fork_hook_registered = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+        # Threads não sobrevivem ao fork (ex.: gunicorn com preload)
+        if not self._fork_hook_registered and hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_after_fork)
+            self._fork_hook_registered = True
+
+    def _restart_after_fork(self):
+        self.outbox.reset_connections()
+        self._stop = threading.Event()
+        self._thread = None
+        self.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"[ERRO] Dispatcher do outbox falhou: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self):
+        """Processa um lote; retorna quantos eventos foram reivindicados"""
+        events = self.outbox.claim(self.batch_size)
+        if not events:
+            return 0
+
+        by_type = {}
+        for event in events:
+            by_type.setdefault(event["type"], []).append(event)
+
+        for event_type, batch in by_type.items():
+            handler = self.handlers.get(event_type)
+            if handler is None:
+                self.outbox.retry(batch, f"Tipo de evento desconhecido: {event_type}")
+                continue
+
+            links = _links_from_events(batch)
+            with tracer.start_as_current_span(f"outbox.deliver {event_type}", links=links) as span:
+                span.set_attribute("outbox.batch.size", len(batch))
+                try:
+                    delivered = handler(batch)
+                    error = "Entrega recusada pelo serviço de destino"
+                except Exception as e:
+                    delivered = []
+                    error = e
+
+                delivered_ids = {e["id"] for e in delivered}
+                failed = [e for e in batch if e["id"] not in delivered_ids]
+                span.set_attribute("outbox.batch.failed", len(failed))
+
+            self.outbox.ack(delivered)
+            if failed:
+                print(f"[WARN] {len(failed)} evento(s) '{event_type}' serão reenviados: {error}")
+                self.outbox.retry(failed, error)
+
+        return len(events)
+
+
+def _links_from_events(events):
+    """Liga o span de entrega aos traces das requisições que geraram os eventos"""
+    links = []
+    for event in events:
+        carrier = event["payload"].get("_trace")
+        if not carrier:
+            continue
+        span_context = trace.get_current_span(extract(carrier)).get_span_context()
+        if span_context.is_valid:
+            links.append(trace.Link(span_context))
+    return links
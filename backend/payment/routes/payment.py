@@ -1,16 +1,27 @@
 from flask import Blueprint, jsonify, request
+import os
 import requests
 from opentelemetry import trace
+from opentelemetry.propagate import inject
+from outbox import create_outbox
+from shared.idempotency import idempotent
 
 payment_bp = Blueprint('payment', __name__, url_prefix = '/payment')
 
 ORDERS_API_URL = "http://orders:5002/orders"
-CART_API_URL = "http://backend:5000/cart/clear"
+# Limpeza de carrinho direto no serviço de carrinho, sem passar pelo gateway
+CART_API_URL = "http://cart:5005/cart/internal/clear"
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
+if not INTERNAL_API_TOKEN:
+    print("[WARN] INTERNAL_API_TOKEN não definido: a limpeza de carrinhos ficará pendente no outbox")
 
 
 tracer =  trace.get_tracer(__name__)
 
+outbox = create_outbox()
+
 @payment_bp.route('/charge', methods=['POST'])
+@idempotent
 def charge():
 
     span = trace.get_current_span()
@@ -20,31 +31,90 @@ def charge():
 
     if not order_id or not user_id:
         return jsonify({"error": "order_id e user_id são obrigatórios"}), 400
-    
+
     span.set_attribute("order.id", order_id)
     span.set_attribute("user.id", user_id)
-    
-    print(f"Pagamento para o pedido {order_id} processado com sucesso.")
 
-    try:
-        confirm_url = f"{ORDERS_API_URL}/{order_id}/confirm_payment"
-        confirm_response = requests.post(confirm_url)
-
-        if confirm_response.status_code != 200:
-            print(f"ERRO: Falha ao confirmar o pagamento para o pedido {order_id}")
-            return jsonify({"error": "Falha ao atualizar o status do pedido"}), 500
-            span.set_attribute("payment.status", "declined")
-        span.set_attribute("payment.status", "paid")
-    
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error":"Não foi possível conectar ao serviço do pedido"}), 503
+    # Propaga o contexto do trace para os eventos entregues em background
+    carrier = {}
+    inject(carrier)
 
+    # A confirmação do pedido é entregue pelo dispatcher; a limpeza do
+    # carrinho é enfileirada depois dela, com os itens que o pedido comprou
     try:
-        clear_cart_response = requests.post(CART_API_URL, json={'user_id':user_id}, cookies=request.cookies)
-        if clear_cart_response.status_code != 200:
-            print(f"AVISO: Não foi possível limpar o carrinho do usuário {user_id}")
-    except requests.exceptions.RequestException as e:
-        print(f"Aviso: Não foi possível conectar ao backend para limpar o carrinho: {e}")
-    
-    return jsonify({"message": "Pagamento bem sucedido e pedido confirmado"}), 200
+        outbox.add([
+            ("confirm_payment", {"order_id": order_id, "_trace": carrier}),
+        ])
+    except Exception as e:
+        span.set_attribute("payment.status", "error")
+        print(f"ERRO: Falha ao registrar o pagamento do pedido {order_id}: {e}")
+        return jsonify({"error": "Falha ao registrar o pagamento"}), 500
+
+    span.set_attribute("payment.status", "paid")
+    print(f"Pagamento para o pedido {order_id} registrado; confirmação pendente.")
+
+    # 202: o pedido ainda não foi verificado nem confirmado (o dispatcher do outbox faz isso)
+    return jsonify({"message": "Pagamento registrado; confirmação do pedido pendente", "order_id": order_id}), 202
+
+
+# ===============================================================
+# Entrega dos eventos do outbox
+# ===============================================================
+def deliver_confirm_payment(events):
+    """
+    Confirma os pedidos em lote; pedidos inexistentes não são reenviados.
+    Para cada pedido confirmado enfileira a limpeza dos itens de carrinho
+    que ele comprou (se o registro falhar, o lote é reenviado: confirmar e
+    limpar por id são idempotentes).
+    """
+    order_ids = [e["payload"]["order_id"] for e in events]
+    response = requests.post(f"{ORDERS_API_URL}/confirm_payment", json={"order_ids": order_ids}, timeout=5)
+    if response.status_code != 200:
+        raise RuntimeError(f"orders respondeu {response.status_code}")
+
+    body = response.json()
+    not_found = set(body.get("not_found", []))
+    if not_found:
+        print(f"AVISO: Pedidos não encontrados ao confirmar pagamento: {sorted(not_found)}")
+
+    traces = {str(e["payload"]["order_id"]): e["payload"].get("_trace") for e in events}
+    clear_events = [
+        ("clear_cart", {
+            "order_id": cart["order_id"],
+            "user_id": cart["user_id"],
+            "cart_item_ids": cart["cart_item_ids"],
+            "_trace": traces.get(str(cart["order_id"])),
+        })
+        for cart in body.get("carts", []) if cart["cart_item_ids"]
+    ]
+    if clear_events:
+        outbox.add(clear_events)
+    return events
+
+
+def deliver_clear_cart(events):
+    """
+    Remove do carrinho apenas os itens comprados por cada pedido: itens
+    adicionados depois do pagamento não são afetados por uma entrega atrasada.
+    """
+    user_ids = sorted({e["payload"]["user_id"] for e in events})
+    cart_item_ids = sorted({i for e in events for i in e["payload"].get("cart_item_ids", [])})
+    if not cart_item_ids:
+        return events
+    if not INTERNAL_API_TOKEN:
+        raise RuntimeError("INTERNAL_API_TOKEN não definido")
+    response = requests.post(
+        CART_API_URL,
+        json={"user_ids": user_ids, "cart_item_ids": cart_item_ids},
+        headers={"X-Internal-Token": INTERNAL_API_TOKEN},
+        timeout=5
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"cart respondeu {response.status_code}")
+    return events
+
 
+DELIVERY_HANDLERS = {
+    "confirm_payment": deliver_confirm_payment,
+    "clear_cart": deliver_clear_cart,
+}
@@ -20,7 +20,4 @@ def init_db(app: Flask):
     }
 
     db.init_app(app)
-
-    # Cria as tabelas no PostgreSQL
-    with app.app_context():
-        db.create_all()
\ No newline at end of file
+    # As tabelas são criadas por seed.py, fora do startup da aplicação
\ No newline at end of file
@@ -2,7 +2,7 @@ from database import db
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key = True)
-    name = db.Column(db.String(80), nullable=False)
+    name = db.Column(db.String(80), nullable=False, unique=True, index=True)
     price = db.Column(db.Float, nullable=False)
     description = db.Column(db.Text, nullable=True)
     image_url = db.Column(db.Text, nullable=True)
@@ -0,0 +1,90 @@
+"""
+Carga idempotente do catálogo de produtos (products.json).
+
+Roda uma vez por pod antes do servidor subir (ver Dockerfile), fora do
+import da aplicação: cria as tabelas, garante o índice único em `name` e faz
+um único upsert em lote. Rodar de novo não duplica produtos nem soma estoque;
+o estoque só é reposto para produtos esgotados.
+
+Uso: python seed.py [caminho/para/products.json]
+"""
+import json
+import os
+import sys
+import time
+
+from flask import Flask
+from sqlalchemy import case, text
+from sqlalchemy.exc import OperationalError
+
+from database import init_db, db
+from models import Product
+
+SEED_DB_TIMEOUT_SECONDS = int(os.getenv("SEED_DB_TIMEOUT_SECONDS", 60))
+
+
+def wait_for_database(timeout=SEED_DB_TIMEOUT_SECONDS):
+    """Espera o PostgreSQL (sidecar) aceitar conexões"""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            db.session.execute(text("SELECT 1"))
+            return
+        except OperationalError as e:
+            db.session.rollback()
+            if time.time() > deadline:
+                raise
+            print(f"Aguardando o banco de dados... ({e.__class__.__name__})")
+            time.sleep(1)
+
+
+def ensure_schema():
+    db.create_all()
+    # Bancos criados antes do índice único não o recebem via create_all
+    db.session.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_product_name ON product (name)"))
+    db.session.commit()
+
+
+def upsert_products(products):
+    """Insere ou atualiza todos os produtos num único INSERT ... ON CONFLICT (name)"""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Banco de dados não suportado para upsert: {dialect}")
+
+    stmt = insert(Product).values(products)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.name],
+        set_={
+            "price": stmt.excluded.price,
+            "description": stmt.excluded.description,
+            "image_url": stmt.excluded.image_url,
+            # Repõe o estoque apenas de produtos esgotados
+            "stock": case((Product.stock <= 0, stmt.excluded.stock), else_=Product.stock),
+        }
+    )
+    db.session.execute(stmt)
+    db.session.commit()
+
+
+def seed(json_path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        products = json.load(f)
+
+    wait_for_database()
+    ensure_schema()
+    if products:
+        upsert_products(products)
+    print(f"Catálogo sincronizado: {len(products)} produto(s).")
+
+
+if __name__ == "__main__":
+    app = Flask(__name__)
+    init_db(app)
+
+    default_path = os.path.join(app.root_path, "products.json")
+    with app.app_context():
+        seed(sys.argv[1] if len(sys.argv) > 1 else default_path)
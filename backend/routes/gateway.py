@@ -13,6 +13,14 @@ CART_API_URL = "http://cart:5005/cart/"
 
 tracer = trace.get_tracer(__name__)
 
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def idempotency_headers():
+    """Repassa a Idempotency-Key do cliente para checkout e pagamento"""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    return {IDEMPOTENCY_HEADER: key} if key else {}
+
 @gateway_bp.route('/orders/', methods=['GET'])
 def get_user_orders():
     #Inicialização da telemetria
@@ -69,7 +77,7 @@ def checkout_gateway():
             "cart_items": cart_items
         }
 
-        checkout_response = requests.post(CHECKOUT_API_URL, json=payload, cookies=request.cookies)
+        checkout_response = requests.post(CHECKOUT_API_URL, json=payload, cookies=request.cookies, headers=idempotency_headers())
         return checkout_response.content, checkout_response.status_code, checkout_response.headers.items()
 
     except requests.exceptions.RequestException as e:
@@ -87,7 +95,7 @@ def payment_gateway():
     payload = request.json
     payload['user_id'] = user_id
     try:
-        response = requests.post(f"{PAYMENT_API_URL}charge", json=payload, cookies=request.cookies)
+        response = requests.post(f"{PAYMENT_API_URL}charge", json=payload, cookies=request.cookies, headers=idempotency_headers())
         return response.content, response.status_code, response.headers.items()
     except requests.exceptions.RequestException as e:
         return jsonify({"error": "Não foi possível conectar ao serviço de pagamento"}), 503
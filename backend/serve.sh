@@ -0,0 +1,8 @@
+#!/bin/sh
+# Inicia o serviço no modo escolhido por SERVER_MODE:
+#   gunicorn (padrão) -> servidor de produção configurado por /srv/gunicorn.conf.py
+#   dev               -> servidor de desenvolvimento do Flask (reloader + debugger)
+if [ "${SERVER_MODE:-gunicorn}" = "dev" ]; then
+    exec python app.py
+fi
+exec gunicorn -c /srv/gunicorn.conf.py app:app
@@ -0,0 +1,120 @@
+"""
+Compara a vazão da loja em cada modo de servidor usando o locustfile existente.
+
+Para cada modo (SERVER_MODE=dev | gunicorn) a stack do docker compose é
+recriada com o modo escolhido, o locust roda em modo headless pelo tempo
+configurado e as estatísticas agregadas são coletadas do CSV do locust.
+
+Exemplos:
+    python benchmark.py --modes dev gunicorn --users 200 --spawn-rate 20 --run-time 2m
+    python benchmark.py --no-restart --host http://localhost:5000 --modes gunicorn
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+SERVICES = ["backend", "products", "orders", "checkout", "payment", "cart"]
+LOCUSTFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locustfile.py")
+
+
+def restart_stack(mode, compose_file):
+    """Recria os serviços Flask com o SERVER_MODE pedido"""
+    env = dict(os.environ, SERVER_MODE=mode)
+    subprocess.run(
+        ["docker", "compose", "-f", compose_file, "up", "-d", "--force-recreate", *SERVICES],
+        env=env, check=True
+    )
+
+
+def wait_until_ready(host, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{host}/products/", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(1)
+    raise TimeoutError(f"{host} não ficou pronto em {timeout}s")
+
+
+def run_locust(host, users, spawn_rate, run_time, csv_prefix):
+    subprocess.run(
+        [
+            "locust", "-f", LOCUSTFILE, "--host", host, "--headless",
+            "-u", str(users), "-r", str(spawn_rate), "-t", run_time,
+            "--csv", csv_prefix, "--only-summary",
+        ],
+        check=False  # o locust retorna 1 quando há falhas; as falhas entram no relatório
+    )
+
+
+def read_aggregated(csv_prefix):
+    """Lê a linha 'Aggregated' do <prefixo>_stats.csv gerado pelo locust"""
+    with open(f"{csv_prefix}_stats.csv", newline="") as f:
+        for row in csv.DictReader(f):
+            if row["Name"] == "Aggregated":
+                requests_count = int(row["Request Count"])
+                failures = int(row["Failure Count"])
+                return {
+                    "requests": requests_count,
+                    "failures": failures,
+                    "failure_rate": failures / requests_count if requests_count else 0.0,
+                    "rps": float(row["Requests/s"]),
+                    "avg_ms": float(row["Average Response Time"]),
+                    "p50_ms": float(row["50%"]),
+                    "p95_ms": float(row["95%"]),
+                    "p99_ms": float(row["99%"]),
+                }
+    raise ValueError(f"Linha 'Aggregated' não encontrada em {csv_prefix}_stats.csv")
+
+
+def print_table(results):
+    header = f"{'modo':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'falhas':>10}"
+    print(header)
+    print("-" * len(header))
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['rps']:>10.1f}{r['p50_ms']:>10.0f}{r['p95_ms']:>10.0f}"
+              f"{r['p99_ms']:>10.0f}{r['failure_rate']:>9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["dev", "gunicorn"])
+    parser.add_argument("--host", default="http://localhost:5000")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--spawn-rate", type=int, default=20)
+    parser.add_argument("--run-time", default="2m")
+    parser.add_argument("--compose-file", default=os.path.join(os.path.dirname(LOCUSTFILE), "..", "docker-compose.yml"))
+    parser.add_argument("--no-restart", action="store_true", help="não recria a stack; usa o host já em execução")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    for mode in args.modes:
+        print(f"\n=== Modo: {mode} ===")
+        if not args.no_restart:
+            restart_stack(mode, args.compose_file)
+        wait_until_ready(args.host)
+
+        csv_prefix = os.path.join(workdir, mode)
+        run_locust(args.host, args.users, args.spawn_rate, args.run_time, csv_prefix)
+        results[mode] = read_aggregated(csv_prefix)
+
+    print()
+    print_table(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,18 @@ import random
 from locust import HttpUser, TaskSet, task, between
 from faker import Faker
 import logging
+import os
+import time
 import uuid
 
 fake = Faker()
 
+# Repetições simuladas de uma mesma operação (mesma Idempotency-Key): o
+# cliente tenta de novo em 5xx/409 e, com DUPLICATE_RATE, reenvia um pedido
+# já respondido, como quando a resposta se perde na rede
+RETRY_ATTEMPTS = int(os.getenv("LOCUST_RETRY_ATTEMPTS", 3))
+DUPLICATE_RATE = float(os.getenv("LOCUST_DUPLICATE_RATE", 0.05))
+
 class UserBehavior(TaskSet):
     product_ids = []
     token = None
@@ -35,6 +43,30 @@ class UserBehavior(TaskSet):
             response.success()
             return True
 
+    def post_idempotent(self, path, name, expected_status, json=None):
+        """POST com uma Idempotency-Key por operação lógica, reutilizada nas repetições"""
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        body = None
+        for attempt in range(RETRY_ATTEMPTS):
+            label = name if attempt == 0 else f"{name} (retry)"
+            with self.client.post(path, json=json, headers=headers, name=label, catch_response=True) as response:
+                retryable = response.status_code >= 500 or response.status_code == 409
+                if retryable and attempt + 1 < RETRY_ATTEMPTS:
+                    response.failure(f"{response.status_code}, repetindo com a mesma Idempotency-Key")
+                    time.sleep(0.5 * 2 ** attempt)
+                    continue
+                if self.check_response(response, expected_status=expected_status):
+                    body = response.json()
+            break
+
+        if body is not None and random.random() < DUPLICATE_RATE:
+            with self.client.post(path, json=json, headers=headers, name=f"{name} (duplicate)",
+                                  catch_response=True) as response:
+                if self.check_response(response, expected_status=expected_status) \
+                        and response.headers.get("Idempotent-Replayed") != "true":
+                    response.failure("Repetição executou a operação de novo")
+        return body
+
     def register_and_login(self):
         email = f"{uuid.uuid4().hex}@test.com"
         password = fake.password()
@@ -114,16 +146,13 @@ class UserBehavior(TaskSet):
                               name="/cart (checkout)", catch_response=True) as response:
             self.check_response(response, expected_status=201)
         
-        order_id = None
-        with self.client.post("/checkout/", name="/checkout", catch_response=True) as response:
-            if self.check_response(response, expected_status=201):
-                order_data = response.json()
-                order_id = order_data.get("order_id")
+        # Uma chave por operação lógica: repetições não duplicam pedidos nem pagamentos
+        order_data = self.post_idempotent("/checkout/", "/checkout", expected_status=201)
+        order_id = order_data.get("order_id") if order_data else None
 
         if order_id:
-            with self.client.post(f"/payment/charge", json={"order_id": order_id},
-                                  name="/payment/charge", catch_response=True) as response:
-                self.check_response(response, expected_status=200)
+            self.post_idempotent("/payment/charge", "/payment/charge", expected_status=202,
+                                 json={"order_id": order_id})
 
     @task(1)
     @safe_task
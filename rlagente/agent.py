@@ -1,56 +1,188 @@
-import numpy as np 
+import numpy as np
 import json
 import os
 
+PROB_MIN, PROB_MAX = 0.01, 0.99  # mantém exploração mínima em todas as políticas
+
+
+def _logit(p):
+    p = np.clip(np.asarray(p, dtype=np.float64), PROB_MIN, PROB_MAX)
+    return np.log(p / (1 - p))
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
 class ReinforceAgent:
-    def __init__(self,num_policies, lr=0.2, baseline_decay = 0.9, policies_path='policy_probabilities.json'):
+    """
+    REINFORCE com uma Bernoulli independente por política, parametrizada por
+    logits (θ). O gradiente do log da probabilidade das ações é (a - p) e o
+    bônus de entropia opcional empurra p para 0.5: dH/dθ = -θ·p·(1-p).
+
+    As atualizações são acumuladas em lotes de `batch_size` episódios e
+    aplicadas com SGD ou Adam. O sorteio das ações usa um Generator próprio
+    (semente `seed`), e checkpoint()/restore() preservam logits, baseline,
+    estado do otimizador, lote pendente e estado do gerador.
+
+    O lr é em logits: dp = p·(1-p)·dθ, ≈ dθ/4 perto de p = 0.5, então o
+    padrão 0.8 equivale ao lr 0.2 da versão que atualizava as probabilidades
+    (mesma convergência no simulador).
+    """
+
+    def __init__(self,num_policies, lr=0.8, baseline_decay = 0.9, policies_path='policy_probabilities.json',
+                 seed=None, batch_size=1, entropy_coef=0.0, optimizer="sgd", betas=(0.9, 0.999), eps=1e-8):
         self.num_policies = num_policies
         self.policies_path = policies_path
 
         with open(self.policies_path, 'r') as f:
-            self.probs = np.array(json.load(f))
+            self.logits = _logit(json.load(f))
 
         self.lr = lr
         self.baseline = 0.0
         self.baseline_decay = baseline_decay
         self.first = True
+        self.last_actions = None
+
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = max(1, int(batch_size))
+        self.entropy_coef = entropy_coef
+        if optimizer not in ("sgd", "adam"):
+            raise ValueError(f"Otimizador desconhecido: {optimizer}")
+        self.optimizer = optimizer
+        self.betas = tuple(betas)
+        self.eps = eps
+        self.m = np.zeros_like(self.logits)  # momentos do Adam
+        self.v = np.zeros_like(self.logits)
+        self.steps = 0
+
+        self._batch_actions = []
+        self._batch_advantages = []
+
+    @property
+    def probs(self):
+        return _sigmoid(self.logits)
+
 
-    
     def select_actions(self, all_policies):
-        actions = []
-        selected = []
-
-        for i, policy in enumerate(all_policies):
-            if np.random.rand() < self.probs[i]:
-                selected.append(policy)
-                actions.append(1)
-            else:
-                actions.append(0)
-        
-        if not selected:
-            idx = np.random.randint(len(all_policies))
-            selected = [all_policies[idx]]
-            actions[idx] = 1
-        
-        # self.last_actions = np.array(actions)
-        return selected, actions
+        actions = (self.rng.random(len(all_policies)) < self.probs).astype(int)
 
-    def update(self, selected_policies, reward, selected_actions):
+        if not actions.any():
+            actions[self.rng.integers(len(all_policies))] = 1
 
+        selected = [policy for policy, a in zip(all_policies, actions) if a]
+        return selected, actions.tolist()
+
+    def update(self, selected_policies, reward, selected_actions):
+        """
+        Versão do cluster: o reward medido é da configuração que acabou de
+        sair, então é pareado com as ações do episódio anterior.
+        """
         if self.first == True:
             self.last_actions = np.array(selected_actions)
             self.first = False
             return
-            
+
+        self._record(self.last_actions, reward)
+        self.last_actions = np.array(selected_actions)
+
+    def learn(self, selected_actions, reward):
+        """
+        Atualização REINFORCE sem defasagem: o reward é do próprio episódio
+        das ações (ambiente simulado). No cluster, update() pareia o reward
+        com as ações do episódio anterior, pois a entropia medida é da
+        configuração que acabou de sair.
+        """
+        self._record(np.array(selected_actions), reward)
+
+    def _record(self, actions, reward):
         self.baseline = (self.baseline_decay * self.baseline +(1-self.baseline_decay)*reward)
 
-        advantage = reward - self.baseline
+        self._batch_actions.append(np.asarray(actions, dtype=np.float64))
+        self._batch_advantages.append(reward - self.baseline)
+        if len(self._batch_actions) >= self.batch_size:
+            self._step()
+
+    def _step(self):
+        """Aplica o gradiente médio do lote pendente"""
+        actions = np.array(self._batch_actions)                 # (K, políticas)
+        advantages = np.array(self._batch_advantages)[:, None]  # (K, 1)
+        self._batch_actions, self._batch_advantages = [], []
+
+        p = self.probs
+        grad = (advantages * (actions - p)).mean(axis=0)
+        if self.entropy_coef:
+            grad += self.entropy_coef * (-self.logits * p * (1 - p))
+
+        self.steps += 1
+        if self.optimizer == "adam":
+            beta1, beta2 = self.betas
+            self.m = beta1 * self.m + (1 - beta1) * grad
+            self.v = beta2 * self.v + (1 - beta2) * grad ** 2
+            m_hat = self.m / (1 - beta1 ** self.steps)
+            v_hat = self.v / (1 - beta2 ** self.steps)
+            self.logits += self.lr * m_hat / (np.sqrt(v_hat) + self.eps)
+        else:
+            self.logits += self.lr * grad
+        self.logits = np.clip(self.logits, _logit(PROB_MIN), _logit(PROB_MAX))
+
+    def checkpoint(self, path):
+        """Grava todo o estado do agente (escrita atômica) para retomar o treino com restore()"""
+        state = {
+            "num_policies": self.num_policies,
+            "logits": self.logits.tolist(),
+            "lr": self.lr,
+            "baseline": self.baseline,
+            "baseline_decay": self.baseline_decay,
+            "first": self.first,
+            "last_actions": None if self.last_actions is None else np.asarray(self.last_actions).tolist(),
+            "batch_size": self.batch_size,
+            "entropy_coef": self.entropy_coef,
+            "optimizer": self.optimizer,
+            "betas": list(self.betas),
+            "eps": self.eps,
+            "m": self.m.tolist(),
+            "v": self.v.tolist(),
+            "steps": self.steps,
+            "batch_actions": [a.tolist() for a in self._batch_actions],
+            "batch_advantages": self._batch_advantages,
+            "rng": self.rng.bit_generator.state,
+        }
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def restore(cls, path, policies_path='policy_probabilities.json', **overrides):
+        """
+        Recria o agente de um checkpoint. `overrides` (lr, batch_size,
+        entropy_coef, optimizer, ...) substituem os hiperparâmetros gravados;
+        trocar o otimizador zera os momentos do Adam.
+        """
+        with open(path) as f:
+            state = json.load(f)
+
+        options = {key: state[key] for key in ("lr", "baseline_decay", "batch_size", "entropy_coef", "optimizer",
+                                               "betas", "eps")}
+        unknown = set(overrides) - set(options)
+        if unknown:
+            raise TypeError(f"Parâmetros desconhecidos para restore: {', '.join(sorted(unknown))}")
+        options.update(overrides)
+
+        agent = cls(state["num_policies"], policies_path=policies_path, **options)
+        agent.logits = np.array(state["logits"])
+        agent.baseline = state["baseline"]
+        agent.first = state["first"]
+        agent.last_actions = None if state["last_actions"] is None else np.array(state["last_actions"])
+        if agent.optimizer == state["optimizer"]:
+            agent.m = np.array(state["m"])
+            agent.v = np.array(state["v"])
+            agent.steps = state["steps"]
+        agent._batch_actions = [np.array(a) for a in state["batch_actions"]]
+        agent._batch_advantages = state["batch_advantages"]
+        agent.rng.bit_generator.state = state["rng"]
+        return agent
 
-        grad = self.last_actions - self.probs
-        self.probs += self.lr * advantage * grad
-        self.probs = np.clip(self.probs, 0.01, 0.99)
-        self.last_actions = np.array(selected_actions)
-        
 
     def save_policies(self, current_test):
         with open("policies_probs_" + str(current_test) + ".json", "w") as f:
@@ -76,10 +208,3 @@ class ReinforceAgent:
 
         with open(path, "w") as f:
             json.dump(historico, f, indent=2)
-
-        
-
-
-
-    
-        
\ No newline at end of file
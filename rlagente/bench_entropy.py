@@ -0,0 +1,96 @@
+"""
+Compara o cálculo de entropia sequencial com o paralelo (ENTROPY_WORKERS)
+usando traces sintéticos no formato dos documentos do Jaeger.
+
+Os traces são gerados em streaming, agrupados por trace como chegam de
+iter_spans_by_hash, então o benchmark de 1M de traces não precisa deles
+todos em memória.
+
+Uso:
+    python bench_entropy.py
+    python bench_entropy.py --sizes 10000 100000 --workers 2 4 8
+"""
+import argparse
+import os
+import random
+import time
+
+from es_utils import count_trace_signatures, count_trace_signatures_parallel, entropy_from_counter, iter_traces
+
+SERVICES = {
+    "frontend": ["GET /", "GET /products"],
+    "checkout": ["POST /checkout/", "GET"],
+    "products": ["GET /products/<int:product_id>", "SELECT"],
+    "orders": ["POST /orders/", "INSERT"],
+    "payment": ["POST /payment/charge", "POST"],
+}
+
+
+def synthetic_spans(n_traces, seed=42):
+    """
+    Gera spans agrupados por trace: 1 raiz + 1..6 filhos com tags variadas.
+    Os traceIDs são aleatórios de 128 bits (do gerador com `seed`), como os
+    do SDK: IDs sequenciais concentram o hash FNV da política probabilística
+    do coletor e nenhum trace seria amostrado por ela.
+    """
+    rng = random.Random(seed)
+    services = list(SERVICES)
+    for _ in range(n_traces):
+        trace_id = f"{rng.getrandbits(128):032x}"
+        root_service = rng.choice(services)
+        root_id = f"{trace_id[:8]}0000"
+        yield {
+            "traceID": trace_id, "spanID": root_id, "startTime": 0,
+            "operationName": SERVICES[root_service][0],
+            "process": {"serviceName": root_service},
+            "references": [],
+            "tags": [
+                {"key": "http.method", "value": "GET"},
+                {"key": "duration_ms", "value": rng.randint(1, 2000)},
+                {"key": "total", "value": rng.choice([0, 50, 500, 5000])},
+            ],
+        }
+        for c in range(rng.randint(1, 6)):
+            service = rng.choice(services)
+            yield {
+                "traceID": trace_id, "spanID": f"{trace_id[:8]}{c + 1:04d}", "startTime": c + 1,
+                "operationName": rng.choice(SERVICES[service]),
+                "process": {"serviceName": service},
+                "references": [{"refType": "CHILD_OF", "spanID": root_id}],
+                "tags": [{"key": "db.duration_ms", "value": rng.randint(1, 400)}],
+            }
+
+
+def run(n_traces, workers):
+    start = time.perf_counter()
+    if workers <= 1:
+        counter = count_trace_signatures(iter_traces(synthetic_spans(n_traces)))
+    else:
+        counter = count_trace_signatures_parallel(iter_traces(synthetic_spans(n_traces)), workers=workers)
+    elapsed = time.perf_counter() - start
+    return elapsed, counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--workers", nargs="+", type=int, default=[2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    header = f"{'traces':>10}{'workers':>9}{'tempo s':>10}{'traces/s':>12}{'speedup':>9}{'entropia':>10}"
+    print(header)
+    print("-" * len(header))
+    for n_traces in args.sizes:
+        base_time, base_counter = run(n_traces, 1)
+        entropy = entropy_from_counter(base_counter)
+        print(f"{n_traces:>10}{1:>9}{base_time:>10.2f}{n_traces / base_time:>12.0f}{'1.00x':>9}{entropy:>10.4f}")
+        for workers in sorted(set(w for w in args.workers if w > 1)):
+            elapsed, counter = run(n_traces, workers)
+            if counter != base_counter:
+                raise AssertionError(f"Contagens divergentes com {workers} workers para {n_traces} traces")
+            print(f"{n_traces:>10}{workers:>9}{elapsed:>10.2f}{n_traces / elapsed:>12.0f}"
+                  f"{base_time / elapsed:>8.2f}x{entropy_from_counter(counter):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Confere o modo ES_RETRIEVAL_MODE=aggregate contra o cálculo no Python.
+
+Parte offline (sempre roda, sem Elasticsearch), sobre um conjunto fixo de
+traces sintéticos (bench_entropy.synthetic_spans):
+
+  - calcular_entropia padrão (trace_to_string, merkle) particiona os traces
+    igual à string canônica completa (use_hash=False);
+  - a assinatura de forma (a do modo aggregate) é um agrupamento da
+    assinatura completa: traces com a mesma assinatura completa têm sempre
+    a mesma forma. Por isso H(forma) <= H(completa) para qualquer α, e a
+    diferença mede o que o modo aggregate deixa de ver (hierarquia, ordem
+    dos filhos e tags). O script exibe quantas classes foram fundidas.
+
+Parte no Elasticsearch (omitida com --offline): indexa os mesmos traces num
+índice temporário com o mapeamento dos campos usados do Jaeger e exige que
+coincidam:
+
+  1. entropia das assinaturas de forma agregadas no Elasticsearch
+  2. calcular_entropia(..., signature=trace_shape_signature) sobre os mesmos spans
+  3. a mesma assinatura calculada sobre os spans lidos com iter_spans_by_hash
+
+O hash fica em process.tag.experiment_hash, como o Jaeger grava o atributo
+de recurso, e o filtro de janela (startTimeMillis) também é conferido.
+
+Uso:
+    python check_signatures.py --offline
+    ES_HOST=http://localhost:9200 python check_signatures.py --traces 5000
+"""
+import argparse
+import sys
+import time
+
+from elasticsearch import helpers
+
+import es_utils
+from bench_entropy import synthetic_spans
+from es_utils import (
+    calcular_entropia, count_trace_shapes_by_hash, count_trace_signatures, count_traces_by_hash, entropy_from_counter,
+    group_spans_by_trace, iter_spans_by_hash, iter_traces, trace_shape_signature, trace_to_string,
+)
+
+FIXTURE_HASH = "fixture0"
+
+# Subconjunto do mapeamento jaeger-span-* usado pelas consultas de es_utils
+MAPPINGS = {
+    "properties": {
+        "traceID": {"type": "keyword"},
+        "spanID": {"type": "keyword"},
+        "operationName": {"type": "keyword"},
+        "startTime": {"type": "long"},
+        "startTimeMillis": {"type": "date", "format": "epoch_millis"},
+        "process": {
+            "properties": {
+                "serviceName": {"type": "keyword"},
+                "tag": {"properties": {"experiment_hash": {"type": "keyword"}}},
+            }
+        },
+        "references": {
+            "type": "nested",
+            "properties": {"refType": {"type": "keyword"}, "spanID": {"type": "keyword"}},
+        },
+        "tags": {
+            "type": "nested",
+            "properties": {"key": {"type": "keyword"}, "value": {"type": "keyword"}},
+        },
+    }
+}
+
+
+def fixture_spans(n_traces):
+    # experiment_hash como o Jaeger grava um atributo de recurso com ES_TAGS_AS_FIELDS_INCLUDE
+    for span in synthetic_spans(n_traces, seed=7):
+        span["process"] = {**span["process"], "tag": {"experiment_hash": FIXTURE_HASH}}
+        span["startTimeMillis"] = span["startTime"] // 1000
+        yield span
+
+
+def offline_check(n_traces):
+    """Assinatura completa (calcular_entropia padrão) x assinatura de forma, sem Elasticsearch"""
+    traces = group_spans_by_trace(list(fixture_spans(n_traces)))
+    full = calcular_entropia(traces)
+    shape = calcular_entropia(traces, signature=trace_shape_signature)
+
+    # Merkle e string canônica completa precisam particionar os traces do mesmo jeito
+    merkle_classes = count_trace_signatures(traces.values())
+    string_classes = count_trace_signatures(traces.values(), signature=lambda s: trace_to_string(s, use_hash=False))
+    same_partition = sorted(merkle_classes.values()) == sorted(string_classes.values())
+
+    # Cada assinatura completa corresponde a uma única forma (a forma é um agrupamento)
+    shape_of = {}
+    refines = True
+    for spans in traces.values():
+        shape_sig = trace_shape_signature(spans)
+        refines &= shape_of.setdefault(trace_to_string(spans), shape_sig) == shape_sig
+    shape_classes = len(set(shape_of.values()))
+
+    print(f"traces (offline):                    {len(traces)}")
+    print(f"entropia (completa, padrão):         {full:.6f}  ({len(merkle_classes)} assinaturas)")
+    print(f"entropia (forma, modo aggregate):    {shape:.6f}  ({shape_classes} formas)")
+    print(f"perda do modo aggregate:             {full - shape:.6f} bits, "
+          f"{len(merkle_classes) - shape_classes} classes fundidas")
+
+    ok = same_partition and refines and shape <= full + 1e-9 and len(traces) == n_traces
+    if not ok:
+        print("DIVERGÊNCIA entre a assinatura completa e a de forma no cálculo offline")
+    return ok, shape, full
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traces", type=int, default=5000)
+    parser.add_argument("--offline", action="store_true", help="só a parte offline, sem Elasticsearch")
+    parser.add_argument("--keep-index", action="store_true")
+    args = parser.parse_args()
+
+    offline_ok, expected, full = offline_check(args.traces)
+    if args.offline:
+        print("OK" if offline_ok else "FALHOU")
+        return 0 if offline_ok else 1
+
+    index = f"signature-check-{int(time.time())}"
+    es = es_utils.es
+    es.indices.create(index=index, mappings=MAPPINGS)
+    es_utils.ES_INDEX = index
+    try:
+        helpers.bulk(es, ({"_index": index, "_source": span} for span in fixture_spans(args.traces)))
+        es.indices.refresh(index=index)
+
+        server_counter = count_trace_shapes_by_hash(FIXTURE_HASH)
+        server = entropy_from_counter(server_counter)
+        streamed_counter = count_trace_signatures(
+            iter_traces(iter_spans_by_hash(FIXTURE_HASH)), signature=trace_shape_signature
+        )
+        streamed = entropy_from_counter(streamed_counter)
+        in_window = count_traces_by_hash(FIXTURE_HASH, window=(0, 1000))
+        out_of_window = count_traces_by_hash(FIXTURE_HASH, window=(10 ** 12, None))
+
+        print(f"traces no índice:                    {sum(server_counter.values())}")
+        print(f"entropia (aggregate, servidor):      {server:.6f}")
+        print(f"entropia (forma, calcular_entropia): {expected:.6f}")
+        print(f"entropia (forma, spans via PIT):     {streamed:.6f}")
+        print(f"traces na janela / fora da janela:   {in_window} / {out_of_window}")
+
+        ok = (
+            offline_ok
+            and server <= full + 1e-9
+            and server_counter == streamed_counter
+            and sum(server_counter.values()) == args.traces
+            and abs(server - expected) < 1e-9
+            and in_window == args.traces
+            and out_of_window == 0
+        )
+        print("OK" if ok else "DIVERGÊNCIA entre o modo aggregate e o cálculo no Python")
+        return 0 if ok else 1
+    finally:
+        if not args.keep_index:
+            es.indices.delete(index=index, ignore_unavailable=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
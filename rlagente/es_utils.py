@@ -4,9 +4,13 @@ import os
 import math
 from collections import Counter
 import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 # 🔹 Usa o serviço "elasticsearch" do Kubernetes por padrão
 ES_HOST = os.getenv("ES_HOST", "http://elasticsearch:9200")
+# Elasticsearch de outro namespace (rollouts no cluster: cada namespace tem o seu Jaeger/ES)
+ES_HOST_TEMPLATE = os.getenv("ES_HOST_TEMPLATE", "http://elasticsearch.{namespace}:9200")
 ES_INDEX = os.getenv("ES_INDEX", "jaeger-span-*")
 
 # 🔧 Parâmetros de entropia e quantização (via ENV, sem mudar assinaturas)
@@ -23,6 +27,8 @@ def _env_int(name, default):
         return default
 
 ENTROPY_ALPHA = _env_float("ENTROPY_ALPHA", 1.0)  # α>1 => mais punitivo para repetidos
+ENTROPY_WORKERS = _env_int("ENTROPY_WORKERS", 1)   # >1 => assinaturas calculadas em paralelo (processos)
+ENTROPY_CHUNK_TRACES = _env_int("ENTROPY_CHUNK_TRACES", 2000)  # traces por tarefa enviada ao pool
 QUANTIZE_MS = _env_int("QUANTIZE_MS", 200)         # bucketização de durações/latências
 QUANTIZE_KEYS = set(
     [s.strip() for s in os.getenv("QUANTIZE_KEYS", "duration_ms,latency_ms,http.duration_ms,db.duration_ms").split(",") if s.strip()]
@@ -32,9 +38,61 @@ QUANTIZE_KEYS = set(
 es = Elasticsearch([ES_HOST])
 
 
-def get_spans_by_hash(config_hash, scroll_size=5000):
-    query = {
-        "query": {
+def es_client_for_namespace(namespace):
+    """Cliente do Elasticsearch do namespace (ES_HOST_TEMPLATE); as consultas aceitam `client`"""
+    return Elasticsearch([ES_HOST_TEMPLATE.format(namespace=namespace)])
+
+
+def _client(client):
+    return es if client is None else client
+
+
+# Campos usados por trace_to_string / group_spans_by_trace e pelo simulador de
+# políticas (duração, tipos das tags, tags do processo); o resto não é trafegado
+SPAN_SOURCE_FIELDS = [
+    "traceID",
+    "spanID",
+    "operationName",
+    "startTime",
+    "duration",
+    "references.refType",
+    "references.spanID",
+    "process.serviceName",
+    "process.tags.key",
+    "process.tags.type",
+    "process.tags.value",
+    "tags.key",
+    "tags.type",
+    "tags.value",
+]
+ES_PAGE_SIZE = _env_int("ES_PAGE_SIZE", 5000)
+ES_PIT_KEEP_ALIVE = os.getenv("ES_PIT_KEEP_ALIVE", "2m")
+
+# spans     -> baixa os spans e calcula a assinatura completa (trace_to_string) no Python
+# aggregate -> o Elasticsearch agrega por traceID e devolve só os pares serviço:operação
+ES_RETRIEVAL_MODE = os.getenv("ES_RETRIEVAL_MODE", "spans").lower()
+ES_AGG_PAGE_SIZE = _env_int("ES_AGG_PAGE_SIZE", 1000)      # traces por página da agregação composite
+ES_AGG_MAX_SHAPES = _env_int("ES_AGG_MAX_SHAPES", 256)     # pares serviço:operação distintos por trace
+
+# es -> consulta o Elasticsearch; snapshot -> lê os arquivos gravados por span_store.py
+SPAN_SOURCE = os.getenv("SPAN_SOURCE", "es").lower()
+
+
+# field  -> experiment_hash é atributo de recurso (processador resource) indexado pelo
+#           Jaeger como campo keyword de topo (ES_TAGS_AS_FIELDS_INCLUDE=experiment_hash)
+# nested -> experiment_hash como tag de span (processador attributes, índices antigos)
+ES_HASH_LOOKUP = os.getenv("ES_HASH_LOOKUP", "field").lower()
+ES_HASH_FIELD = os.getenv("ES_HASH_FIELD", "process.tag.experiment_hash")
+
+
+def _hash_query(config_hash, window=None):
+    """
+    Filtro dos spans de um hash. `window` = (início, fim) em ms desde a época
+    (qualquer lado pode ser None) restringe startTimeMillis ao intervalo do
+    episódio, o que também descarta índices diários fora dele.
+    """
+    if ES_HASH_LOOKUP == "nested":
+        hash_filter = {
             "nested": {
                 "path": "tags",
                 "query": {
@@ -47,21 +105,66 @@ def get_spans_by_hash(config_hash, scroll_size=5000):
                 }
             }
         }
-    }
-    resp = es.search(index=ES_INDEX, body=query, size=scroll_size, scroll="2m")
+    else:
+        hash_filter = {"term": {ES_HASH_FIELD: config_hash}}
+
+    filters = [hash_filter]
+    if window is not None:
+        start_ms, end_ms = window
+        time_range = {"format": "epoch_millis"}
+        if start_ms is not None:
+            time_range["gte"] = int(start_ms)
+        if end_ms is not None:
+            time_range["lte"] = int(end_ms)
+        filters.append({"range": {"startTimeMillis": time_range}})
+    return {"bool": {"filter": filters}}
 
-    spans = []
-    sid = resp["_scroll_id"]
-    scroll_size = len(resp["hits"]["hits"])
 
-    while scroll_size > 0:
-        for hit in resp["hits"]["hits"]:
-            spans.append(hit["_source"])
+def iter_spans_by_hash(config_hash, page_size=ES_PAGE_SIZE, keep_alive=ES_PIT_KEEP_ALIVE, window=None, client=None):
+    """
+    Gera os spans de um hash página a página (point-in-time + search_after),
+    ordenados por traceID: spans de um mesmo trace chegam em sequência.
+    Só uma página fica em memória; o PIT é fechado ao final (ou se o
+    consumidor parar antes). `window`: intervalo do episódio (ver _hash_query).
+    `client`: outro Elasticsearch (padrão: o de ES_HOST).
+    """
+    es_client = _client(client)
+    pit_id = es_client.open_point_in_time(index=ES_INDEX, keep_alive=keep_alive)["id"]
+    try:
+        search_after = None
+        while True:
+            params = {
+                "pit": {"id": pit_id, "keep_alive": keep_alive},
+                "query": _hash_query(config_hash, window),
+                "sort": [{"traceID": "asc"}, {"_shard_doc": "asc"}],
+                "source": SPAN_SOURCE_FIELDS,
+                "size": page_size,
+                "track_total_hits": False,
+            }
+            if search_after is not None:
+                params["search_after"] = search_after
+
+            resp = es_client.search(**params)
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp["hits"]["hits"]
+            if not hits:
+                return
+
+            for hit in hits:
+                yield hit["_source"]
+
+            if len(hits) < page_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        try:
+            es_client.close_point_in_time(id=pit_id)
+        except Exception as e:
+            print(f"[WARN] Falha ao fechar o point-in-time: {e}")
 
-        resp = es.scroll(scroll_id=sid, scroll="2m")
-        sid = resp["_scroll_id"]
-        scroll_size = len(resp["hits"]["hits"])
 
+def get_spans_by_hash(config_hash, scroll_size=ES_PAGE_SIZE, window=None, client=None):
+    spans = list(iter_spans_by_hash(config_hash, page_size=scroll_size, window=window, client=client))
     #print(f"Total de spans encontrados para hash {config_hash}: {len(spans)}")
     return spans
 
@@ -100,38 +203,82 @@ def _quantize_value_if_applicable(key, value, bucket_ms):
     return str(value)
 
 
-def trace_to_string(spans, use_hash=True, tag_blacklist=None):
+DEFAULT_TAG_BLACKLIST = frozenset({
+    "otel.status_code",
+    "span.kind",
+    "thread.id",
+    "thread.name",
+    "http.status_code",
+    "peer.ipv4",
+    "peer.ipv6",
+    "peer.port",
+    "peer.service",
+    "pid",
+    "telemetry.sdk.language",
+    "telemetry.sdk.name",
+    "telemetry.sdk.version",
+    "net.peer.port",
+    "user.id",
+    "order.id"
+})
+
+# merkle -> hash por subárvore, sem montar a string (mesma partição de traces que "string")
+# string -> SHA256 da string canônica completa
+TRACE_SIGNATURE = os.getenv("TRACE_SIGNATURE", "merkle").lower()
+SPAN_LABEL_CACHE_SIZE = _env_int("SPAN_LABEL_CACHE_SIZE", 65536)
+
+
+def _span_key(span, tag_blacklist):
     """
-    Constrói uma string determinística representando a hierarquia de um trace.
-    - Cada span é um bloco: "Serviço:Operação|tag1=valor1|tag2=valor2|..."
-    - A hierarquia é respeitada: pai → filhos (em ordem de startTime)
-    - Tags que estão na 'tag_blacklist' são ignoradas.
-    - Se use_hash=True, retorna o hash SHA256 da string final.
-
-    🔧 Modificações:
-    - Quantização de tags numéricas em QUANTIZE_KEYS por buckets de QUANTIZE_MS (via ENV).
+    Projeção do span que define o rótulo: serviço, operação e tags fora da
+    blacklist, ordenadas pela chave, com os valores já quantizados (texto).
+    Ids e durações de alta cardinalidade ficam de fora (blacklist) ou caem
+    no mesmo bucket, então spans com o mesmo rótulo compartilham a chave.
     """
-    if tag_blacklist is None:
-        tag_blacklist = {
-            "otel.status_code",
-            "span.kind",
-            "thread.id",
-            "thread.name",
-            "http.status_code",
-            "peer.ipv4",
-            "peer.ipv6",
-            "peer.port",
-            "peer.service",
-            "pid",
-            "telemetry.sdk.language",
-            "telemetry.sdk.name",
-            "telemetry.sdk.version",
-            "net.peer.port",
-            "user.id",
-            "order.id"
-        }
+    tags = [
+        (t["key"], _quantize_value_if_applicable(t["key"], t.get("value"), QUANTIZE_MS))
+        for t in span.get("tags", ())
+        if t["key"] not in tag_blacklist
+    ]
+    tags.sort(key=lambda t: t[0])
+    return (
+        span.get("process", {}).get("serviceName", "unknown"),
+        span.get("operationName", "unknown"),
+        tuple(tags),
+    )
 
-    # Mapeia spans por ID e constrói estrutura pai → filhos
+
+def _render_label(key):
+    service, operation, tags = key
+    return "|".join([f"{service}:{operation}", *(f"{k}={v}" for k, v in tags)])
+
+
+# Memoização por rótulo: spans repetidos (ex.: o mesmo GET em products) só
+# têm o texto montado e o hash calculado uma vez
+_label_cache = {}
+_leaf_digest_cache = {}
+
+
+def _cached(cache, key, build):
+    value = cache.get(key)
+    if value is None:
+        if len(cache) >= SPAN_LABEL_CACHE_SIZE:
+            cache.clear()
+        value = cache[key] = build(key)
+    return value
+
+
+def _span_label(span, tag_blacklist):
+    """"Serviço:Operação|tag1=valor1|..." de um span (memoizado)"""
+    return _cached(_label_cache, _span_key(span, tag_blacklist), _render_label)
+
+
+def _leaf_digest(key):
+    return hashlib.sha256(hashlib.sha256(_render_label(key).encode()).digest()).digest()
+
+
+def _span_tree(spans):
+    """Mapa pai → filhos (por spanID) e spans raiz ordenados por startTime"""
     spans_by_id = {s['spanID']: s for s in spans}
     children_map = {s['spanID']: [] for s in spans}
     root_spans = []
@@ -149,45 +296,81 @@ def trace_to_string(spans, use_hash=True, tag_blacklist=None):
         else:
             root_spans.append(span)
 
-    # Ordena spans raiz
-    root_spans.sort(key=lambda s: s.get("startTime", 0))
-
-    def build_span_block(span, level=0):
-        """
-        Constrói recursivamente um bloco de texto para um span e seus filhos.
-        """
-        indent = "  " * level  # apenas para visualização/estabilidade
-        service = span.get("process", {}).get("serviceName", "unknown")
-        operation = span.get("operationName", "unknown")
-
-        # Filtra, quantiza (quando aplicável) e ordena tags
-        tags = []
-        for tag in sorted(span.get("tags", []), key=lambda t: t["key"]):
-            k = tag["key"]
-            if k in tag_blacklist:
-                continue
-            v = tag.get("value")
-            v_str = _quantize_value_if_applicable(k, v, QUANTIZE_MS)
-            tags.append(f"{k}={v_str}")
-
-        # Monta o bloco do span
-        span_str = f"{indent}{service}:{operation}"
-        if tags:
-            span_str += "|" + "|".join(tags)
-
-        # Concatena recursivamente os filhos
-        children = sorted(children_map.get(span["spanID"], []), key=lambda s: s.get("startTime", 0))
-        for child in children:
-            span_str += "\n" + build_span_block(child, level + 1)
+    root_spans.sort(key=_start_time)
+    return children_map, root_spans
+
+
+def _start_time(span):
+    return span.get("startTime", 0)
+
 
-        return span_str
+def _children(children_map, span):
+    children = children_map.get(span["spanID"])
+    if not children:
+        return ()
+    return sorted(children, key=_start_time) if len(children) > 1 else children
 
-    # Constrói a string completa (ordem determinística dos spans raiz)
-    full_str_parts = []
+
+def _preorder(children_map, root_spans):
+    """Percorre pai → filhos (filhos por startTime) sem recursão; gera (span, nível, filhos)"""
+    stack = [(root, 0) for root in reversed(root_spans)]
+    while stack:
+        span, level = stack.pop()
+        children = _children(children_map, span)
+        yield span, level, children
+        for child in reversed(children):
+            stack.append((child, level + 1))
+
+
+def _merkle_signature(children_map, root_spans, tag_blacklist):
+    """
+    Hash de cada bloco = SHA256(hash do rótulo + hashes dos filhos, em ordem);
+    o trace é o hash da sequência de raízes. Cada span é processado uma vez e
+    folhas idênticas reaproveitam o hash já calculado.
+    """
+    digests = {}
+    # Em pré-ordem invertida os filhos são sempre processados antes do pai
+    for span, _, children in reversed(list(_preorder(children_map, root_spans))):
+        key = _span_key(span, tag_blacklist)
+        if not children:
+            digests[id(span)] = _cached(_leaf_digest_cache, key, _leaf_digest)
+            continue
+        h = hashlib.sha256(hashlib.sha256(_cached(_label_cache, key, _render_label).encode()).digest())
+        for child in children:
+            h.update(digests[id(child)])
+        digests[id(span)] = h.digest()
+
+    h = hashlib.sha256()
     for root in root_spans:
-        full_str_parts.append(build_span_block(root))
+        h.update(digests[id(root)])
+    return h.hexdigest()
+
+
+def trace_to_string(spans, use_hash=True, tag_blacklist=None):
+    """
+    Constrói uma string determinística representando a hierarquia de um trace.
+    - Cada span é um bloco: "Serviço:Operação|tag1=valor1|tag2=valor2|..."
+    - A hierarquia é respeitada: pai → filhos (em ordem de startTime)
+    - Tags que estão na 'tag_blacklist' são ignoradas.
+    - Se use_hash=True, retorna o hash SHA256 da string final.
+
+    🔧 Modificações:
+    - Quantização de tags numéricas em QUANTIZE_KEYS por buckets de QUANTIZE_MS (via ENV).
+    - Com use_hash=True e TRACE_SIGNATURE=merkle (padrão) o hash é composto por
+      subárvore, sem montar a string; traces iguais continuam com hashes iguais.
+    - Com use_hash=False a saída é idêntica byte a byte à versão recursiva.
+    """
+    tag_blacklist = DEFAULT_TAG_BLACKLIST if tag_blacklist is None else frozenset(tag_blacklist)
+    children_map, root_spans = _span_tree(spans)
+
+    if use_hash and TRACE_SIGNATURE == "merkle":
+        return _merkle_signature(children_map, root_spans, tag_blacklist)
 
-    canonical_str = "\n".join(full_str_parts)
+    # Uma linha por span, indentada pelo nível (apenas para visualização/estabilidade)
+    canonical_str = "\n".join(
+        "  " * level + _span_label(span, tag_blacklist)
+        for span, level, _ in _preorder(children_map, root_spans)
+    )
 
     # Retorna o hash se desejado
     if use_hash:
@@ -196,38 +379,220 @@ def trace_to_string(spans, use_hash=True, tag_blacklist=None):
         return canonical_str
 
 
-def calcular_entropia(traces):
+def entropy_from_counter(counter, alpha=None):
     """
-    Calcula a entropia (por padrão, Rényi com α=ENTROPY_ALPHA) a partir das strings representando cada trace.
-    - Se ENTROPY_ALPHA == 1.0 => Shannon (compatível conceitualmente).
-    - Mantém a mesma assinatura e retorna um float como antes.
+    Entropia (Rényi de ordem α, base 2; Shannon quando α == 1) da distribuição
+    de frequências em `counter` (assinatura do trace -> ocorrências).
     """
-    strings = []
-    for trace_id, spans in traces.items():
-        s = trace_to_string(spans)  # spans já organizados; aplica quantização na serialização
-        strings.append(s)
-
-    if not strings:
+    total = sum(counter.values())
+    if total == 0:
         return 0.0
 
-    counter = Counter(strings)
-    total = sum(counter.values())
+    if alpha is None:
+        alpha = ENTROPY_ALPHA
     ps = [c / total for c in counter.values()]
 
-    alpha = ENTROPY_ALPHA
-
     # Shannon (base 2) se α=1
     if abs(alpha - 1.0) < 1e-12:
-        entropia = -sum(p * math.log2(p) for p in ps if p > 0)
-        return entropia
+        return -sum(p * math.log2(p) for p in ps if p > 0)
 
     # Rényi geral (base 2): H_α = (1/(1-α)) * log2(Σ p_i^α)
     # α>1 penaliza fortemente duplicatas
     sum_p_alpha = sum((p ** alpha) for p in ps)
     # Evita problemas numéricos
     sum_p_alpha = max(sum_p_alpha, 1e-300)
-    entropia = (1.0 / (1.0 - alpha)) * math.log2(sum_p_alpha)
-    return entropia
+    return (1.0 / (1.0 - alpha)) * math.log2(sum_p_alpha)
+
+
+def calcular_entropia(traces, signature=None):
+    """
+    Calcula a entropia (por padrão, Rényi com α=ENTROPY_ALPHA) a partir das strings representando cada trace.
+    - Se ENTROPY_ALPHA == 1.0 => Shannon (compatível conceitualmente).
+    - Mantém a mesma assinatura e retorna um float como antes.
+    - `signature` troca a assinatura por trace (padrão: trace_to_string).
+    """
+    return entropy_from_counter(count_trace_signatures(traces.values(), signature))
+
+
+def iter_traces(spans):
+    """
+    Agrupa spans consecutivos com o mesmo traceID e gera (trace_id, spans) à
+    medida que cada trace termina. Espera a entrada ordenada por traceID
+    (como em iter_spans_by_hash); só um trace fica em memória por vez.
+    """
+    current_id = None
+    current = []
+    for span in spans:
+        trace_id = span.get("traceID")
+        if not trace_id:
+            continue
+        if trace_id != current_id:
+            if current:
+                yield current_id, current
+            current_id = trace_id
+            current = []
+        current.append(span)
+    if current:
+        yield current_id, current
+
+
+def count_trace_signatures(traces, signature=None):
+    """
+    Conta as assinaturas canônicas (trace_to_string, ou `signature`) de um
+    iterável de traces, cada um uma lista de spans ou um par (trace_id, spans).
+    """
+    signature = signature or trace_to_string
+    counter = Counter()
+    for trace in traces:
+        if isinstance(trace, tuple):
+            trace = trace[1]
+        counter[signature(trace)] += 1
+    return counter
+
+
+def _count_chunk(chunk, signature=None):
+    # Executa no processo filho: recebe listas de spans, devolve só as contagens
+    return count_trace_signatures(chunk, signature)
+
+
+def _chunks(traces, size):
+    chunk = []
+    for trace in traces:
+        if isinstance(trace, tuple):
+            trace = trace[1]
+        chunk.append(trace)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def count_trace_signatures_parallel(traces, workers=None, chunk_size=None, signature=None):
+    """
+    Mesmo resultado de count_trace_signatures, distribuindo blocos de traces
+    completos entre `workers` processos e somando os contadores parciais.
+    No máximo 2 blocos por processo ficam pendentes, então a entrada continua
+    sendo consumida em streaming.
+    """
+    workers = workers or ENTROPY_WORKERS
+    chunk_size = chunk_size or ENTROPY_CHUNK_TRACES
+    if workers <= 1:
+        return count_trace_signatures(traces, signature)
+
+    counter = Counter()
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(traces, chunk_size):
+            pending.append(pool.submit(_count_chunk, chunk, signature))
+            if len(pending) >= workers * 2:
+                counter.update(pending.popleft().result())
+        while pending:
+            counter.update(pending.popleft().result())
+    return counter
+
+
+# ===============================================================
+# Assinatura de forma (serviço:operação) calculada no Elasticsearch
+# ===============================================================
+def _shape_signature(shape_counts):
+    """Hash do multiconjunto {"serviço:operação": ocorrências} de um trace"""
+    canonical = "\n".join(f"{key}*{count}" for key, count in sorted(shape_counts.items()))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def trace_shape_signature(spans):
+    """
+    Assinatura equivalente à do modo "aggregate", calculada a partir dos spans:
+    considera só quais serviço:operação aparecem e quantas vezes (sem
+    hierarquia nem tags), por isso é mais grossa que trace_to_string.
+    """
+    shape_counts = Counter(
+        f"{span.get('process', {}).get('serviceName', 'unknown')}:{span.get('operationName', 'unknown')}"
+        for span in spans
+    )
+    return _shape_signature(shape_counts)
+
+
+_SHAPE_RUNTIME_FIELD = {
+    "span_shape": {
+        "type": "keyword",
+        "script": {
+            "source": (
+                "def s = doc['process.serviceName'].size() == 0 ? 'unknown' : doc['process.serviceName'].value;"
+                "def o = doc['operationName'].size() == 0 ? 'unknown' : doc['operationName'].value;"
+                "emit(s + ':' + o);"
+            )
+        },
+    }
+}
+
+
+def iter_trace_shapes_by_hash(config_hash, page_size=ES_AGG_PAGE_SIZE, window=None, client=None):
+    """
+    Gera a assinatura de forma de cada trace de um hash usando uma agregação
+    composite por traceID com sub-agregação terms sobre serviço:operação.
+    Só as contagens trafegam; nenhum documento de span é retornado.
+    Um trace com mais de ES_AGG_MAX_SHAPES pares distintos teria a forma
+    truncada (assinatura errada), então gera erro em vez de ser contado.
+    """
+    es_client = _client(client)
+    after_key = None
+    while True:
+        composite = {
+            "size": page_size,
+            "sources": [{"trace": {"terms": {"field": "traceID"}}}],
+        }
+        if after_key is not None:
+            composite["after"] = after_key
+
+        resp = es_client.search(
+            index=ES_INDEX,
+            size=0,
+            track_total_hits=False,
+            query=_hash_query(config_hash, window),
+            runtime_mappings=_SHAPE_RUNTIME_FIELD,
+            aggs={
+                "traces": {
+                    "composite": composite,
+                    "aggs": {"shapes": {"terms": {"field": "span_shape", "size": ES_AGG_MAX_SHAPES}}},
+                }
+            },
+        )
+        agg = resp["aggregations"]["traces"]
+        for bucket in agg["buckets"]:
+            shapes = bucket["shapes"]
+            if shapes.get("sum_other_doc_count", 0) > 0:
+                raise RuntimeError(
+                    f"Trace {bucket['key']['trace']} tem mais de ES_AGG_MAX_SHAPES={ES_AGG_MAX_SHAPES} "
+                    f"pares serviço:operação distintos; aumente ES_AGG_MAX_SHAPES"
+                )
+            shape_counts = {b["key"]: b["doc_count"] for b in shapes["buckets"]}
+            yield _shape_signature(shape_counts)
+
+        after_key = agg.get("after_key")
+        if not agg["buckets"] or after_key is None:
+            return
+
+
+def count_trace_shapes_by_hash(config_hash, window=None, client=None):
+    return Counter(iter_trace_shapes_by_hash(config_hash, window=window, client=client))
+
+
+def count_traces_by_hash(config_hash, window=None, client=None):
+    """
+    Número (aproximado, exato até ~3000) de traces já indexados de um hash.
+    Só uma agregação cardinality: serve para acompanhar o volume durante a
+    janela do episódio sem baixar spans.
+    """
+    resp = _client(client).search(
+        index=ES_INDEX,
+        size=0,
+        track_total_hits=False,
+        query=_hash_query(config_hash, window),
+        aggs={"traces": {"cardinality": {"field": "traceID", "precision_threshold": 3000}}},
+    )
+    return resp["aggregations"]["traces"]["value"]
 
 
 def group_spans_by_trace(spans):
@@ -291,12 +656,35 @@ def group_spans_by_trace(spans):
     return traces
 
 
-def export_traces_by_hash(config_hash):
+def export_signature_counts(config_hash, window=None, client=None):
     """
-    Função principal: busca spans de um hash, monta os traces e retorna a entropia.
-    Retorna (entropia, quantidade_de_traces) — mesmas saídas de antes.
+    Counter assinatura -> ocorrências dos traces de um hash, pela fonte
+    configurada (SPAN_SOURCE / ES_RETRIEVAL_MODE). `window` e `client` (outro
+    Elasticsearch, ex.: es_client_for_namespace) só valem para o Elasticsearch.
     """
-    spans = get_spans_by_hash(config_hash)
-    traces = group_spans_by_trace(spans)
+    if SPAN_SOURCE == "snapshot":
+        # Reprocessamento offline; no modo aggregate usa a mesma assinatura de forma do servidor
+        from span_store import iter_snapshot_traces  # import tardio: span_store importa es_utils
+        signature = trace_shape_signature if ES_RETRIEVAL_MODE == "aggregate" else None
+        counter = count_trace_signatures_parallel(iter_snapshot_traces(config_hash), signature=signature)
+    elif ES_RETRIEVAL_MODE == "aggregate":
+        # Assinaturas de forma calculadas no servidor; só contagens trafegam
+        counter = count_trace_shapes_by_hash(config_hash, window, client)
+    else:
+        # Pipeline em streaming: spans ordenados por traceID -> um trace por vez -> contador
+        # (em paralelo quando ENTROPY_WORKERS > 1)
+        counter = count_trace_signatures_parallel(
+            iter_traces(iter_spans_by_hash(config_hash, window=window, client=client))
+        )
+
+    return counter
+
 
-    return calcular_entropia(traces), len(traces)
+def export_traces_by_hash(config_hash, window=None, client=None):
+    """
+    Função principal: busca spans de um hash, monta os traces e retorna a entropia.
+    Retorna (entropia, quantidade_de_traces) — mesmas saídas de antes, sem
+    manter todos os spans/traces do episódio em memória.
+    """
+    counter = export_signature_counts(config_hash, window, client)
+    return entropy_from_counter(counter), sum(counter.values())
@@ -1,14 +1,17 @@
 import time
 import hashlib
-from kubernetes import client, config
+from kubernetes import client, config, watch
 import json
 import random
 import yaml
 import os
+from concurrent.futures import ThreadPoolExecutor
 from history import *
 from es_utils import *
+from metrics_utils import prometheus_url_for_namespace, red_delta, red_snapshot, red_summary
 
 from agent import ReinforceAgent
+from scoring import reward_function, count_histogram
 
 
 
@@ -22,9 +25,19 @@ NAMESPACE = "rmalves"
 DEPLOYMENT_NAME = "collector"
 CONFIGMAP_NAME = "collector-config"
 POLICIES_FILE = "tail_sampling_policies.json"
+MAX_NUMBER_EPISODES = 300
+MAX_NUMBER_OF_TESTS = 25
+EPISODE_WINDOW_S = float(os.getenv("EPISODE_WINDOW_S", "60"))#Janela mínima de medição de cada episódio (antes: sleep fixo de 60s)
+EPISODE_MAX_WINDOW_S = float(os.getenv("EPISODE_MAX_WINDOW_S", "180"))#Encerra a janela mesmo sem EPISODE_MIN_TRACES traces
+EPISODE_MIN_TRACES = int(os.getenv("EPISODE_MIN_TRACES", "0"))#Traces indexados da configuração atual para encerrar a janela (0 = só o tempo)
+EPISODE_POLL_S = float(os.getenv("EPISODE_POLL_S", "5"))#Intervalo entre consultas ao volume de traces
+ROLLOUT_TIMEOUT_S = float(os.getenv("ROLLOUT_TIMEOUT_S", "300"))#Tempo máximo esperando o rollout do coletor
+JAEGER_OTLP_TEMPLATE = os.getenv("JAEGER_OTLP_TEMPLATE", "http://jaeger.{namespace}:4318")#Jaeger que recebe os traces do coletor de cada namespace
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "")#Diretório (volume persistente) dos checkpoints por episódio; vazio = sem checkpoint
+HASH_WINDOW_SLACK_S = float(os.getenv("HASH_WINDOW_SLACK_S", "120"))#Margem da janela de tempo de cada hash (decision_wait do tail sampling + relógios)
 #######################################################################################################################################
 #Gera o arquivo de configurações do coletor
-def generate_config(selected_policies, config_hash):
+def generate_config(selected_policies, config_hash, namespace=NAMESPACE):
     config_dict = {# Monta configuração do coletor
         "receivers": {
             "otlp": {
@@ -41,26 +54,26 @@ def generate_config(selected_policies, config_hash):
                 "policies": selected_policies
             },
             
-            "attributes": {# 🔹 Injeta o hash como atributo em cada trace
-                "actions": [
+            "resource": {# 🔹 Injeta o hash como atributo de recurso (uma vez por lote, não por span); o Jaeger indexa como campo próprio (process.tag.experiment_hash)
+                "attributes": [
                     {
                         "key": "experiment_hash",
                         "value": config_hash,
-                        "action": "insert"
+                        "action": "upsert"
                     }
                 ]
             }
         },
         "exporters": {
             "debug": {"verbosity": "detailed"},
-            "otlphttp": {"endpoint": "http://jaeger:4318"},
+            "otlphttp": {"endpoint": JAEGER_OTLP_TEMPLATE.format(namespace=namespace)},
             "prometheus": {"endpoint": "0.0.0.0:9464"}
         },
         "service": {
             "pipelines": {
                 "traces": {
                     "receivers": ["otlp"],
-                    "processors": ["tail_sampling", "attributes"],
+                    "processors": ["tail_sampling", "resource"],
                     "exporters": ["otlphttp"]
                 },
                 "metrics": {
@@ -74,23 +87,23 @@ def generate_config(selected_policies, config_hash):
     return yaml.dump(config_dict)#retorna o arquivo yaml de configuração do coletor, o valor de hash para essa configuração, e as políticas selecionadas
 #######################################################################################################################################
 #Cria e substitui o configmap collector-config com a nova configuração
-def update_configmap(config_yaml):
+def update_configmap(config_yaml, namespace=NAMESPACE):
     cm_body = client.V1ConfigMap(#Cria o novo config map a partir do arquivo yaml gerado anteriormente a partir das novas políticas
-        metadata=client.V1ObjectMeta(name=CONFIGMAP_NAME, namespace=NAMESPACE),
+        metadata=client.V1ObjectMeta(name=CONFIGMAP_NAME, namespace=namespace),
         data={"config.yaml": config_yaml}
     )
     try:#Tenta substituir um configmap já criado anteriormente
-        core_v1.replace_namespaced_config_map(CONFIGMAP_NAME, NAMESPACE, cm_body)
+        core_v1.replace_namespaced_config_map(CONFIGMAP_NAME, namespace, cm_body)
         #print(f"ConfigMap {CONFIGMAP_NAME} updated")
     except client.exceptions.ApiException as e:#Se não existia nenhum configmap, então cria um novo com a nova configuração
         if e.status == 404:
-            core_v1.create_namespaced_config_map(NAMESPACE, cm_body)
+            core_v1.create_namespaced_config_map(namespace, cm_body)
             #print(f"ConfigMap {CONFIGMAP_NAME} created")
         else:
             raise
 #######################################################################################################################################
 #Atualiza o deployment collector, adicionado o config-hash como annotation no pod. Isso força o kubernetes a verificar que o template mudou, e gera um rolling update automático que substitui os pods com a configuração nova
-def rolling_update_deployment(config_yaml, config_hash):
+def rolling_update_deployment(config_yaml, config_hash, namespace=NAMESPACE):
     patch = {#Patch a ser aplicado no pod
         "spec": {
             "template": {
@@ -102,80 +115,150 @@ def rolling_update_deployment(config_yaml, config_hash):
             }
         }
     }
-    apps_v1.patch_namespaced_deployment(#Aplicação do patch com a hash gerada para a nova configuração
-        name=DEPLOYMENT_NAME, namespace=NAMESPACE, body=patch
+    deployment = apps_v1.patch_namespaced_deployment(#Aplicação do patch com a hash gerada para a nova configuração
+        name=DEPLOYMENT_NAME, namespace=namespace, body=patch
     )
     #print(f"Deployment {DEPLOYMENT_NAME} patched with config hash {config_hash}")
+    return deployment.metadata.generation#Geração do spec com a nova hash; o rollout só vale quando o controller a observar
 
 #######################################################################################################################################
-#Função que fica esperando para ver se o rollout está completo e o agente pode seguir com suas atividades
-def wait_for_rollout_ready():
-    while True:
-        deployment = apps_v1.read_namespaced_deployment(DEPLOYMENT_NAME, NAMESPACE)#Busca o objeto que representa o deploy do coletor no namespace especificado
-        desired = deployment.spec.replicas#Verifica quantos pods estão especificados para se ter do collector, no caso apenas 1
-        available = deployment.status.available_replicas or 0 #Verifica quantas réplicas estão disponíveis atualmente dentro dos deployments
-        if available >= desired:#Se o número de réplicas for maior ou igual o desejado, considera-se o rollout completo e sai do loop
-            #print("Rollout completo!")
-            return
-        #print(f"Aguardando rollout... {available}/{desired} prontos")#Se ainda continua com menos que o número desejado de pods, aguarda 2 segundos até tentar novamente
-        time.sleep(2)
+#Rollout completo para a geração `generation` (mesmos critérios do kubectl rollout status): o controller observou o novo spec, todas as réplicas são do novo ReplicaSet, estão disponíveis e não sobrou pod antigo
+def rollout_complete(deployment, generation):
+    desired = deployment.spec.replicas if deployment.spec.replicas is not None else 1
+    status = deployment.status
+    if status is None or (status.observed_generation or 0) < generation:
+        return False
+    updated = status.updated_replicas or 0
+    return updated == desired and (status.replicas or 0) == updated and (status.available_replicas or 0) == updated
 #######################################################################################################################################
-def trace_penalty_function(traces, C, k=25, midpoint=0.20):
-    x = traces / C
-    return 1 / (1 + math.exp(-k * (x - midpoint)))
-
-    
-#Função de reward para o conjunto de regras definido
-def reward_function(entropy, traces, alpha=1.0, beta=1.0, C = 10000, lambd=3.0):
-    norm_entropy = entropy/10
+#Função que fica esperando o rollout da nova configuração terminar, acompanhando o deployment por watch (sem polling)
+def wait_for_rollout_ready(generation=None, timeout=ROLLOUT_TIMEOUT_S, namespace=NAMESPACE):
+    if generation is None:#Sem a geração do patch, espera a geração atual do deployment
+        generation = apps_v1.read_namespaced_deployment(DEPLOYMENT_NAME, namespace).metadata.generation
 
-    trace_penalty = trace_penalty_function(traces, C)
-
-    return alpha * norm_entropy - beta * trace_penalty
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"Rollout de {DEPLOYMENT_NAME} (geração {generation}) não terminou em {timeout:.0f}s; seguindo mesmo assim")
+            return False
+        w = watch.Watch()
+        try:
+            #O watch começa com o estado atual (evento ADDED) e segue as mudanças de status do deployment
+            for event in w.stream(apps_v1.list_namespaced_deployment, namespace,
+                                  field_selector=f"metadata.name={DEPLOYMENT_NAME}",
+                                  timeout_seconds=max(1, int(remaining))):
+                if event["type"] != "DELETED" and rollout_complete(event["object"], generation):
+                    return True
+        except client.exceptions.ApiException as e:
+            if e.status != 410:#410 Gone: resourceVersion expirou, basta reabrir o watch
+                raise
+        finally:
+            w.stop()
 #######################################################################################################################################
-#Função principal
-if __name__ == "__main__":
+#Aplica a nova configuração no coletor: atualiza o configmap e faz o rolling update, esperando o novo pod
+def apply_config(config_yaml, config_hash, namespace=NAMESPACE):
+    update_configmap(config_yaml, namespace)
+    generation = rolling_update_deployment(config_yaml, config_hash, namespace)
+    wait_for_rollout_ready(generation, namespace=namespace)
+#######################################################################################################################################
+#Janela de medição do episódio: pelo menos EPISODE_WINDOW_S segundos e, se configurado, até a configuração atual ter EPISODE_MIN_TRACES traces indexados (limitado a EPISODE_MAX_WINDOW_S)
+def wait_for_episode_window(config_hash, window_start, hash_window=None, es_client=None):
+    while True:
+        elapsed = time.monotonic() - window_start
+        if elapsed >= EPISODE_MAX_WINDOW_S:
+            return elapsed
+        if elapsed >= EPISODE_WINDOW_S:
+            if EPISODE_MIN_TRACES <= 0 or count_traces_by_hash(config_hash, hash_window, es_client) >= EPISODE_MIN_TRACES:
+                return elapsed
+            wait = EPISODE_POLL_S
+        else:
+            wait = EPISODE_WINDOW_S - elapsed
+        time.sleep(max(0.0, min(wait, EPISODE_MAX_WINDOW_S - elapsed)))
+#######################################################################################################################################
+#Contadores RED (métricas pré-agregadas dos serviços, no endpoint Prometheus do coletor); None se o endpoint não responder, para não interromper o episódio
+def safe_red_snapshot(namespace=NAMESPACE):
+    try:
+        return red_snapshot(prometheus_url_for_namespace(namespace))
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Métricas RED indisponíveis em {namespace}: {e}")
+        return None
+#######################################################################################################################################
+#Checkpoint do teste em CHECKPOINT_DIR: estado do agente (ReinforceAgent.checkpoint) e histórico até o episódio atual
+def checkpoint_paths(current_test):
+    return (os.path.join(CHECKPOINT_DIR, f"agent_checkpoint_{current_test}.json"),
+            os.path.join(CHECKPOINT_DIR, f"run_state_{current_test}.json"))
 
-    MAX_NUMBER_EPISODES = 300
-    current_episode = 0
+def save_checkpoint(current_test, agent, history_buffer, done=False):
+    agent_path, state_path = checkpoint_paths(current_test)
+    agent.checkpoint(agent_path)#Agente antes do histórico: se cair entre as duas escritas, só o último episódio é repetido
+    with open(state_path + ".tmp", "w") as f:
+        json.dump({"done": done, "history": history_buffer}, f)
+    os.replace(state_path + ".tmp", state_path)
 
-    current_test = 0
-    MAX_NUMBER_OF_TESTS = 25
+def load_checkpoint(current_test):
+    agent_path, state_path = checkpoint_paths(current_test)
+    if not CHECKPOINT_DIR or not (os.path.exists(agent_path) and os.path.exists(state_path)):
+        return None
+    with open(state_path) as f:
+        return agent_path, json.load(f)
+#######################################################################################################################################
+#Executa um teste completo: agente novo, MAX_NUMBER_EPISODES episódios, histórico e probabilidades gravados ao final
+#namespace/es_client: coletor e Elasticsearch do experimento (rollouts.py roda um namespace por processo); agent_options: hiperparâmetros do ReinforceAgent
+def run_test(current_test, all_policies, max_episodes=MAX_NUMBER_EPISODES, seed=None, agent_options=None,
+             namespace=NAMESPACE, es_client=None):
     history_buffer = []
+    checkpoint = load_checkpoint(current_test)
+    if checkpoint is not None:#Retoma um teste interrompido; as opções informadas substituem as gravadas
+        agent_path, state = checkpoint
+        history_buffer = state["history"]
+        agent = ReinforceAgent.restore(agent_path, **(agent_options or {}))
+        if state["done"]:#Teste já concluído: o laço não roda e só os arquivos de resultado são regravados
+            print(f"[{namespace}] Teste {current_test} já concluído ({len(history_buffer)} episódios)")
+            max_episodes = len(history_buffer)
+        else:
+            agent.first = True#O episódio em andamento na queda não tem medição confiável: recomeça o pareamento ação/reward
+            print(f"[{namespace}] Retomando o teste {current_test} no episódio {len(history_buffer) + 1}")
+    else:
+        agent = ReinforceAgent(num_policies = len(all_policies), seed=seed, **(agent_options or {}))
+    config_hash = "jausj"#Primeira hash não é utilizada e nem gera traces
+    scorer = ThreadPoolExecutor(max_workers=1)#Calcula a entropia do episódio anterior enquanto a janela do atual corre
+    applied_ms = {}#Instante (ms) em que cada hash passou a valer: limita a busca no Elasticsearch à janela do episódio
+    red_by_hash = {}#Taxa, taxa de erro e latência média dos serviços durante a janela de cada hash (metrics_utils)
+    slack_ms = HASH_WINDOW_SLACK_S * 1000
 
-    with open(POLICIES_FILE, "r") as f:
-        all_policies = json.load(f)
-
-    agent = ReinforceAgent(num_policies = len(all_policies))
-    
-    first = True
+    for current_episode in range(len(history_buffer) + 1, max_episodes + 1):
+        old_hash = config_hash
 
-    while True:
-        current_episode = current_episode + 1
-        if first:#Primeira hash não é utilizada e nem gera traces
-            old_hash = "jausj"
-            first = False
-        else:
-            old_hash = config_hash
-    
         selected_policies, selected_actions = agent.select_actions(all_policies)
         
         policies_str = json.dumps(selected_policies, sort_keys = True)
         timestamp = str(time.time())
         hash_input = policies_str + timestamp
         config_hash = hashlib.sha256(hash_input.encode()).hexdigest()[:8] 
-        config_yaml = generate_config(selected_policies, config_hash)
+        config_yaml = generate_config(selected_policies, config_hash, namespace)
 
-        update_configmap(config_yaml)
-        rolling_update_deployment(config_yaml, config_hash)
+        apply_config(config_yaml, config_hash, namespace)
+        window_start = time.monotonic()
+        applied_ms[config_hash] = time.time() * 1000
+        red_start = safe_red_snapshot(namespace)
 
-        wait_for_rollout_ready()
+        #Spans do hash anterior começaram entre a sua aplicação e a aplicação do atual (com margem)
+        old_window = (applied_ms[old_hash] - slack_ms, applied_ms[config_hash] + slack_ms) if old_hash in applied_ms else None
+        scoring = scorer.submit(export_signature_counts, old_hash, old_window, es_client)
+        window = wait_for_episode_window(config_hash, window_start, (applied_ms[config_hash] - slack_ms, None), es_client) if current_episode < max_episodes else 0.0
+        applied_ms.pop(old_hash, None)
+        if window and red_start is not None:
+            red_end = safe_red_snapshot(namespace)
+            if red_end is not None:
+                red_by_hash[config_hash] = red_summary(red_delta(red_start, red_end, window))
 
-        entropia, number_of_traces = export_traces_by_hash(old_hash)
+        signature_counts = scoring.result()
+        entropia, number_of_traces = entropy_from_counter(signature_counts), sum(signature_counts.values())
 
         reward = reward_function(entropia, number_of_traces)
         agent.update(selected_policies, reward, selected_actions)
-        print(f"Hash: {config_hash}, reward: {reward}, Entropia: {entropia}, Número de traces: {number_of_traces}")
+        print(f"[{namespace}] Hash: {config_hash}, reward: {reward}, Entropia: {entropia}, Número de traces: {number_of_traces}, Janela: {window:.0f}s")
 
         history_buffer.append({
             "episode": current_episode,
@@ -183,21 +266,30 @@ if __name__ == "__main__":
             "entropy": entropia,
             "reward": reward,
             "number_of_traces": number_of_traces,
+            "signature_counts": count_histogram(signature_counts),  # permite recalcular a entropia (scoring.py)
+            "red": red_by_hash.pop(old_hash, None),  # taxa, taxa de erro e latência média da janela (None sem métricas)
         })
+        if CHECKPOINT_DIR:
+            save_checkpoint(current_test, agent, history_buffer)
 
-        if current_episode < MAX_NUMBER_EPISODES:
-            time.sleep(60)
-        else:
-            with open("episodes_history_" + str(current_test) + ".json", "w") as f:
-                json.dump(history_buffer, f, indent=2)
-            agent.save_policies(current_test)
-            first = True
-            agent = ReinforceAgent(num_policies = len(all_policies))
-            current_test = current_test + 1
-            history_buffer = []
-            current_episode = 0
-            if current_test >= MAX_NUMBER_OF_TESTS:
-                time.sleep(100000)
+    scorer.shutdown()
+    with open("episodes_history_" + str(current_test) + ".json", "w") as f:
+        json.dump(history_buffer, f, indent=2)
+    agent.save_policies(current_test)
+    if CHECKPOINT_DIR:
+        save_checkpoint(current_test, agent, history_buffer, done=True)
+    return history_buffer
+#######################################################################################################################################
+#Função principal
+if __name__ == "__main__":
+
+    with open(POLICIES_FILE, "r") as f:
+        all_policies = json.load(f)
+
+    for current_test in range(MAX_NUMBER_OF_TESTS):
+        run_test(current_test, all_policies)
+
+    time.sleep(100000)
 
 
 
@@ -41,12 +41,12 @@ def generate_config(selected_policies, config_hash):
                 "policies": selected_policies
             },
             
-            "attributes": {# 🔹 Injeta o hash como atributo em cada trace
-                "actions": [
+            "resource": {# 🔹 Injeta o hash como atributo de recurso; o Jaeger indexa como campo próprio (process.tag.experiment_hash)
+                "attributes": [
                     {
                         "key": "experiment_hash",
                         "value": config_hash,
-                        "action": "insert"
+                        "action": "upsert"
                     }
                 ]
             }
@@ -60,7 +60,7 @@ def generate_config(selected_policies, config_hash):
             "pipelines": {
                 "traces": {
                     "receivers": ["otlp"],
-                    "processors": ["tail_sampling", "attributes"],
+                    "processors": ["tail_sampling", "resource"],
                     "exporters": ["otlphttp"]
                 },
                 "metrics": {
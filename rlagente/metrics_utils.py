@@ -0,0 +1,86 @@
+import os
+import re
+import urllib.request
+from collections import defaultdict
+
+# 🔹 Endpoint Prometheus do coletor (pipeline de métricas)
+PROMETHEUS_URL = os.getenv("PROMETHEUS_URL", "http://collector:9464/metrics")
+# Coletor de outro namespace (manager/rollouts: um coletor por namespace)
+PROMETHEUS_URL_TEMPLATE = os.getenv("PROMETHEUS_URL_TEMPLATE", "http://collector.{namespace}:9464/metrics")
+
+_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def prometheus_url_for_namespace(namespace):
+    return PROMETHEUS_URL_TEMPLATE.format(namespace=namespace)
+
+
+def fetch_prometheus_metrics(url=PROMETHEUS_URL, timeout=5):
+    """Lê o formato texto do Prometheus e retorna [(nome, labels, valor)]"""
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        text = resp.read().decode("utf-8")
+
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _LINE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        try:
+            samples.append((name, dict(_LABEL.findall(labels or "")), float(value)))
+        except ValueError:
+            continue
+    return samples
+
+
+def red_snapshot(url=PROMETHEUS_URL):
+    """
+    Contadores cumulativos por (serviço, rota) das métricas RED exportadas
+    pelos serviços: requisições, erros e soma das durações (segundos).
+    """
+    snapshot = defaultdict(lambda: {"requests": 0.0, "errors": 0.0, "duration_sum": 0.0})
+    for name, labels, value in fetch_prometheus_metrics(url):
+        if not name.startswith("http_server_request_"):
+            continue
+        key = (labels.get("job", ""), labels.get("http_route", ""))
+        if name.startswith("http_server_request_duration") and name.endswith("_count"):
+            snapshot[key]["requests"] += value
+        elif name.startswith("http_server_request_duration") and name.endswith("_sum"):
+            snapshot[key]["duration_sum"] += value
+        elif name.startswith("http_server_request_errors"):
+            snapshot[key]["errors"] += value
+    return dict(snapshot)
+
+
+def red_delta(before, after, window_seconds):
+    """Taxa, taxa de erro e latência média entre dois snapshots (ex.: início/fim do episódio)"""
+    result = {}
+    for key, now in after.items():
+        prev = before.get(key, {"requests": 0.0, "errors": 0.0, "duration_sum": 0.0})
+        requests = now["requests"] - prev["requests"]
+        if requests <= 0:
+            continue
+        result[key] = {
+            "rate": requests / window_seconds if window_seconds > 0 else 0.0,
+            "error_rate": (now["errors"] - prev["errors"]) / requests,
+            "mean_latency_s": (now["duration_sum"] - prev["duration_sum"]) / requests,
+        }
+    return result
+
+
+def red_summary(delta):
+    """
+    Agrega o red_delta de todas as rotas: taxa total, taxa de erro e latência
+    média ponderadas pelo número de requisições. None se não houve tráfego.
+    """
+    rate = sum(v["rate"] for v in delta.values())
+    if rate <= 0:
+        return None
+    return {
+        "rate": rate,
+        "error_rate": sum(v["rate"] * v["error_rate"] for v in delta.values()) / rate,
+        "mean_latency_s": sum(v["rate"] * v["mean_latency_s"] for v in delta.values()) / rate,
+    }
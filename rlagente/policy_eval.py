@@ -0,0 +1,628 @@
+"""
+Avaliação colunar das políticas de tail sampling sobre traces gravados.
+
+Os traces são carregados uma vez em colunas NumPy (duração e nº de spans
+por trace; nome, status e atributos por span, com o índice span -> trace).
+Cada política de tail_sampling_policies.json vira uma máscara booleana
+sobre todos os traces:
+
+    latency, span_count, status_code, string_attribute, numeric_attribute,
+    ottl_condition (condições de span), probabilistic, and, composite
+
+Condições de span são avaliadas sobre todos os spans e reduzidas a traces
+com bincount. A política probabilística usa o mesmo hash do coletor
+(FNV-1a 64 de hash_salt + traceID), então a decisão é determinística por
+trace. Em composite todas as sub-políticas contam (sem limite de taxa).
+
+Como o coletor amostra um trace se qualquer política o amostrar, o
+resultado de um subconjunto de políticas (o vetor de ações do
+ReinforceAgent.select_actions) é o OU bit a bit das máscaras selecionadas.
+
+Uso:
+    python policy_eval.py --snapshot <hash> [<hash> ...] --output masks.npz
+    python policy_eval.py --synthetic 100000
+"""
+import argparse
+import hashlib
+import json
+import operator
+import re
+import sys
+import time
+
+import numpy as np
+
+from es_utils import ENTROPY_ALPHA, iter_traces, trace_to_string
+from scoring import entropies
+
+POLICIES_FILE = "tail_sampling_policies.json"
+DEFAULT_HASH_SALT = "default-hash-seed"  # mesmo padrão do tailsamplingprocessor
+
+
+# ===============================================================
+# Valores de tags no formato do Jaeger
+# ===============================================================
+def _tag_value(tag):
+    """Converte o valor conforme o tipo do Jaeger (o ES pode guardar números como texto)"""
+    value = tag.get("value")
+    kind = tag.get("type")
+    try:
+        if kind == "int64" and not isinstance(value, bool):
+            return int(value)
+        if kind == "float64":
+            return float(value)
+        if kind == "bool" and isinstance(value, str):
+            return value.lower() == "true"
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def _attributes(tags):
+    return {tag["key"]: _tag_value(tag) for tag in tags or ()}
+
+
+# ===============================================================
+# Condições OTTL (subconjunto usado nas políticas ottl_condition)
+# ===============================================================
+_TOKEN = re.compile(r'\s*(?:(\d+\.\d*|\d*\.\d+|\d+)|("(?:[^"\\]|\\.)*")|(==|!=|>=|<=|>|<|\(|\)|\[|\])|([A-Za-z_][A-Za-z0-9_.]*))')
+_COMPARE = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Condição OTTL inválida perto de: {text[pos:pos + 20]!r}")
+        number, string, symbol, word = match.groups()
+        if number is not None:
+            tokens.append(("value", float(number) if "." in number else int(number)))
+        elif string is not None:
+            tokens.append(("value", json.loads(string)))
+        elif symbol is not None:
+            tokens.append(("symbol", symbol))
+        else:
+            tokens.append(("word", word))
+        pos = match.end()
+    return tokens
+
+
+class _OTTLParser:
+    """
+    Descida recursiva para: or / and / not, parênteses, comparações
+    (== != >= <= > <) entre attributes["k"], resource.attributes["k"], name,
+    números, strings, true, false e nil. Gera uma árvore de tuplas:
+
+        ("or", [..]) ("and", [..]) ("not", x) ("cmp", op, a, b) ("true", a)
+        operandos: ("const", v) ("attr", "attributes" | "resource", k) ("name",)
+    """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        expr = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Token inesperado na condição OTTL: {self.tokens[self.pos][1]!r}")
+        return expr
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, expected=None):
+        token = self._peek()
+        if token[0] is None:
+            raise ValueError("Fim inesperado da condição OTTL")
+        if expected is not None and token[1] != expected:
+            raise ValueError(f"Esperado {expected!r} na condição OTTL, encontrado {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def _or(self):
+        terms = [self._and()]
+        while self._peek() == ("word", "or"):
+            self._take()
+            terms.append(self._and())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def _and(self):
+        terms = [self._not()]
+        while self._peek() == ("word", "and"):
+            self._take()
+            terms.append(self._not())
+        return terms[0] if len(terms) == 1 else ("and", terms)
+
+    def _not(self):
+        if self._peek() == ("word", "not"):
+            self._take()
+            return ("not", self._not())
+        return self._comparison()
+
+    def _comparison(self):
+        if self._peek() == ("symbol", "("):
+            self._take("(")
+            expr = self._or()
+            self._take(")")
+            return expr
+
+        left = self._operand()
+        kind, op = self._peek()
+        if kind != "symbol" or op not in _COMPARE:
+            return ("true", left)
+        self._take()
+        return ("cmp", op, left, self._operand())
+
+    def _operand(self):
+        kind, value = self._take()
+        if kind == "value":
+            return ("const", value)
+        if kind != "word":
+            raise ValueError(f"Operando inválido na condição OTTL: {value!r}")
+        if value in ("true", "false"):
+            return ("const", value == "true")
+        if value == "nil":
+            return ("const", None)
+        if value == "name":
+            return ("name",)
+        if value in ("attributes", "resource.attributes"):
+            self._take("[")
+            key_kind, key = self._take()
+            if key_kind != "value" or not isinstance(key, str):
+                raise ValueError("Chave de atributo deve ser uma string")
+            self._take("]")
+            return ("attr", "attributes" if value == "attributes" else "resource", key)
+        raise ValueError(f"Caminho OTTL não suportado: {value}")
+
+
+def parse_ottl(condition):
+    return _OTTLParser(condition).parse()
+
+
+def _ottl_keys(node):
+    tag = node[0]
+    if tag == "attr":
+        return {(node[1], node[2])}
+    if tag in ("or", "and"):
+        return set().union(*(_ottl_keys(n) for n in node[1]))
+    if tag in ("not", "true"):
+        return _ottl_keys(node[1])
+    if tag == "cmp":
+        return _ottl_keys(node[2]) | _ottl_keys(node[3])
+    return set()
+
+
+def policy_keys(policy):
+    """Atributos (origem, chave) lidos por uma política — só esses viram colunas"""
+    kind = policy["type"]
+    cfg = policy.get(kind, {})
+    if kind in ("string_attribute", "numeric_attribute"):
+        return {("resource", cfg["key"]), ("attributes", cfg["key"])}
+    if kind == "ottl_condition":
+        return set().union(*(_ottl_keys(parse_ottl(c)) for c in cfg.get("span", [])))
+    if kind == "and":
+        return set().union(*(policy_keys(p) for p in cfg["and_sub_policy"]))
+    if kind == "composite":
+        return set().union(*(policy_keys(p) for p in cfg.get("composite_sub_policy", [])))
+    return set()
+
+
+# ===============================================================
+# Colunas
+# ===============================================================
+class _Value:
+    """
+    Valores de um operando por span (ou escalar, para constantes):
+    num (float, nan se não numérico), codes (índice em vocab, -1 se não
+    string), flag (1/0, -1 se não booleano) e present (não nulo).
+    """
+    __slots__ = ("num", "codes", "vocab", "flag", "present")
+
+    def __init__(self, num, codes, vocab, flag, present):
+        self.num, self.codes, self.vocab, self.flag, self.present = num, codes, vocab, flag, present
+
+    @classmethod
+    def constant(cls, value):
+        number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        return cls(
+            float(value) if number else np.nan,
+            0 if isinstance(value, str) else -1,
+            [value] if isinstance(value, str) else [],
+            int(value) if isinstance(value, bool) else -1,
+            value is not None,
+        )
+
+    @classmethod
+    def from_sparse(cls, size, indices, values):
+        num = np.full(size, np.nan)
+        codes = np.full(size, -1, dtype=np.int64)
+        flag = np.full(size, -1, dtype=np.int8)
+        present = np.zeros(size, dtype=bool)
+        vocab = {}
+        for i, value in zip(indices, values):
+            if value is None:
+                continue
+            present[i] = True
+            if isinstance(value, bool):
+                flag[i] = value
+            elif isinstance(value, (int, float)):
+                num[i] = value
+            elif isinstance(value, str):
+                codes[i] = vocab.setdefault(value, len(vocab))
+        return cls(num, codes, list(vocab), flag, present)
+
+    @property
+    def scalar(self):
+        return np.ndim(self.codes) == 0
+
+    def lookup(self, predicate):
+        """predicate(string) aplicado uma vez por valor distinto; False onde não há string"""
+        table = np.array([bool(predicate(v)) for v in self.vocab] + [False])
+        return table[self.codes]
+
+
+def _text_compare(op, a, b):
+    compare = _COMPARE[op]
+    if b.scalar and a.scalar:
+        return bool(a.vocab and b.vocab and compare(a.vocab[0], b.vocab[0]))
+    if b.scalar:
+        return a.lookup(lambda v: b.vocab and compare(v, b.vocab[0])) if b.vocab else False
+    if a.scalar:
+        return b.lookup(lambda v: a.vocab and compare(a.vocab[0], v)) if a.vocab else False
+    # Dois atributos: decodifica só onde ambos são strings
+    both = (a.codes >= 0) & (b.codes >= 0)
+    result = np.zeros(len(both), dtype=bool)
+    left = np.array(a.vocab, dtype=object)[a.codes[both]]
+    right = np.array(b.vocab, dtype=object)[b.codes[both]]
+    result[both] = np.asarray(compare(left, right), dtype=bool)
+    return result
+
+
+def _compare(op, a, b):
+    with np.errstate(invalid="ignore"):
+        if op in ("==", "!="):
+            equal = (
+                np.equal(a.num, b.num)
+                | _text_compare("==", a, b)
+                | (np.equal(a.flag, b.flag) & np.greater_equal(a.flag, 0))
+                | (~np.asarray(a.present) & ~np.asarray(b.present))
+            )
+            return equal if op == "==" else ~equal
+        # Ordem só entre números ou entre strings
+        return _COMPARE[op](a.num, b.num) | _text_compare(op, a, b)
+
+
+class TraceColumns:
+    """Traces em colunas NumPy, construídas numa única passada pelos spans"""
+
+    def __init__(self, traces, keys=None):
+        """
+        `traces`: iterável de (trace_id, spans). `keys`: conjunto de
+        (origem, chave) a guardar (None guarda todos os atributos).
+        """
+        self.trace_ids = []
+        durations, span_counts, signature_ids = [], [], []
+        span_trace, names, statuses = [], [], []
+        signatures, status_codes, sparse = {}, {}, {}
+
+        for t, (trace_id, spans) in enumerate(traces):
+            self.trace_ids.append(trace_id)
+            span_counts.append(len(spans))
+            signature_ids.append(signatures.setdefault(trace_to_string(spans), len(signatures)))
+            if spans:
+                start = min(s.get("startTime", 0) for s in spans)
+                end = max(s.get("startTime", 0) + s.get("duration", 0) for s in spans)
+                durations.append((end - start) / 1000)  # Jaeger usa µs
+            else:
+                durations.append(0.0)
+
+            for s in spans:
+                i = len(span_trace)
+                span_trace.append(t)
+                names.append(s.get("operationName"))
+                attributes = _attributes(s.get("tags"))
+                for source, values in (("attributes", attributes),
+                                       ("resource", _attributes(s.get("process", {}).get("tags")))):
+                    for key, value in values.items():
+                        if keys is None or (source, key) in keys:
+                            column = sparse.setdefault((source, key), ([], []))
+                            column[0].append(i)
+                            column[1].append(value)
+                status = str(attributes.get("otel.status_code", "")).upper()
+                if not status and attributes.get("error") is True:
+                    status = "ERROR"
+                statuses.append(status_codes.setdefault(status or "UNSET", len(status_codes)))
+
+        self.n_traces = len(self.trace_ids)
+        self.n_spans = len(span_trace)
+        self.n_signatures = len(signatures)
+        self.duration_ms = np.array(durations, dtype=np.float64)
+        self.span_count = np.array(span_counts, dtype=np.int64)
+        self.signature_ids = np.array(signature_ids, dtype=np.int64)
+        self.span_trace = np.array(span_trace, dtype=np.int64)
+        self.status = np.array(statuses, dtype=np.int64)
+        self.status_vocab = list(status_codes)
+        self.names = _Value.from_sparse(self.n_spans, range(self.n_spans), names)
+        self._sparse = sparse
+        self._columns = {}
+
+    def attribute(self, source, key):
+        """Coluna (_Value por span) de um atributo; materializada no primeiro uso"""
+        column = self._columns.get((source, key))
+        if column is None:
+            indices, values = self._sparse.get((source, key), ((), ()))
+            column = self._columns[(source, key)] = _Value.from_sparse(self.n_spans, indices, values)
+        return column
+
+    def any_span(self, span_mask):
+        """Máscara por span -> máscara por trace (algum span do trace casa)"""
+        span_mask = np.broadcast_to(span_mask, (self.n_spans,))
+        return np.bincount(self.span_trace[span_mask], minlength=self.n_traces) > 0
+
+    def trace_hashes(self, salt):
+        """FNV-1a 64 de salt + bytes do traceID, como na política probabilística do coletor"""
+        prime = 0x100000001b3
+        seed = 0xcbf29ce484222325
+        for byte in salt.encode():
+            seed = ((seed ^ byte) * prime) & 0xFFFFFFFFFFFFFFFF
+
+        id_bytes = np.frombuffer(b"".join(_trace_id_bytes(t) for t in self.trace_ids), dtype=np.uint8)
+        id_bytes = id_bytes.reshape(self.n_traces, 16)
+        hashes = np.full(self.n_traces, seed, dtype=np.uint64)
+        prime = np.uint64(prime)
+        for column in id_bytes.T:
+            hashes ^= column.astype(np.uint64)
+            hashes *= prime  # uint64 multiplica módulo 2^64
+        return hashes
+
+
+def _trace_id_bytes(trace_id):
+    try:
+        return bytes.fromhex(trace_id.rjust(32, "0"))[-16:]
+    except ValueError:
+        # IDs fora do formato hexadecimal (fixtures): ainda determinístico
+        return hashlib.md5(trace_id.encode()).digest()
+
+
+# ===============================================================
+# Máscaras por política
+# ===============================================================
+def _ottl_value(node, columns):
+    tag = node[0]
+    if tag == "const":
+        return _Value.constant(node[1])
+    if tag == "name":
+        return columns.names
+    return columns.attribute(node[1], node[2])
+
+
+def _ottl_spans(node, columns):
+    """Máscara (spans,) da condição OTTL"""
+    tag = node[0]
+    if tag == "or":
+        mask = np.logical_or.reduce([_ottl_spans(n, columns) for n in node[1]])
+    elif tag == "and":
+        mask = np.logical_and.reduce([_ottl_spans(n, columns) for n in node[1]])
+    elif tag == "not":
+        mask = ~_ottl_spans(node[1], columns)
+    elif tag == "true":
+        mask = np.equal(_ottl_value(node[1], columns).flag, 1)
+    else:
+        _, op, left, right = node
+        mask = _compare(op, _ottl_value(left, columns), _ottl_value(right, columns))
+    # Comparações só entre constantes dão um escalar
+    return np.broadcast_to(mask, (columns.n_spans,))
+
+
+def _any_attribute(columns, key, predicate):
+    # O coletor verifica atributos do recurso e do span
+    return columns.any_span(predicate(columns.attribute("resource", key))
+                            | predicate(columns.attribute("attributes", key)))
+
+
+def _between(values, low, high):
+    mask = values >= low
+    if high:
+        mask &= values <= high
+    return mask
+
+
+def policy_mask(policy, columns, cache=None):
+    """Máscara booleana (traces,) dos traces que a política amostra"""
+    if cache is not None:
+        key = json.dumps(policy, sort_keys=True)
+        if key in cache:
+            return cache[key]
+
+    kind = policy["type"]
+    cfg = policy.get(kind, {})
+
+    if kind == "latency":
+        mask = _between(columns.duration_ms, cfg.get("threshold_ms", 0), cfg.get("upper_threshold_ms"))
+
+    elif kind == "span_count":
+        mask = _between(columns.span_count, cfg.get("min_spans", 0), cfg.get("max_spans"))
+
+    elif kind == "status_code":
+        codes = set(cfg.get("status_codes", []))
+        table = np.array([status in codes for status in columns.status_vocab], dtype=bool)
+        mask = columns.any_span(table[columns.status]) if len(table) else np.zeros(columns.n_traces, dtype=bool)
+
+    elif kind == "string_attribute":
+        values = cfg.get("values", [])
+        if cfg.get("enabled_regex_matching"):
+            patterns = [re.compile(v) for v in values]
+            match = lambda v: any(p.search(v) for p in patterns)
+        else:
+            allowed = set(values)
+            # Sem "values" o coletor não casa nenhum valor
+            match = allowed.__contains__
+        mask = _any_attribute(columns, cfg["key"], lambda column: column.lookup(match))
+        if cfg.get("invert_match", False):
+            mask = ~mask
+
+    elif kind == "numeric_attribute":
+        low = cfg.get("min_value", float("-inf"))
+        high = cfg.get("max_value", float("inf"))
+        with np.errstate(invalid="ignore"):
+            mask = _any_attribute(columns, cfg["key"], lambda column: (column.num >= low) & (column.num <= high))
+
+    elif kind == "ottl_condition":
+        spans = np.zeros(columns.n_spans, dtype=bool)
+        for condition in cfg.get("span", []):
+            spans |= _ottl_spans(parse_ottl(condition), columns)
+        mask = columns.any_span(spans)
+
+    elif kind == "probabilistic":
+        ratio = min(max(cfg.get("sampling_percentage", 0) / 100, 0.0), 1.0)
+        threshold = np.uint64(min(int(ratio * 2 ** 64), 2 ** 64 - 1))
+        mask = columns.trace_hashes(cfg.get("hash_salt") or DEFAULT_HASH_SALT) <= threshold
+
+    elif kind == "and":
+        mask = np.logical_and.reduce([policy_mask(p, columns, cache) for p in cfg["and_sub_policy"]])
+
+    elif kind == "composite":
+        subs = [policy_mask(p, columns, cache) for p in cfg.get("composite_sub_policy", [])]
+        mask = np.logical_or.reduce(subs) if subs else np.zeros(columns.n_traces, dtype=bool)
+
+    else:
+        raise ValueError(f"Tipo de política não suportado: {kind}")
+
+    mask = np.broadcast_to(mask, (columns.n_traces,)).astype(bool)
+    if cache is not None:
+        cache[key] = mask
+    return mask
+
+
+class PolicyMasks:
+    """
+    Máscaras de amostragem de cada política (bits empacotados, uma linha por
+    política) e a assinatura de cada trace. Um vetor de ações é avaliado com
+    um OU das linhas selecionadas, sem reprocessar os traces.
+    """
+
+    def __init__(self, names, packed, n_traces, signature_ids):
+        self.names = list(names)
+        self.packed = packed
+        self.n_traces = n_traces
+        self.signature_ids = signature_ids
+        self.n_signatures = int(signature_ids.max()) + 1 if len(signature_ids) else 0
+
+    @classmethod
+    def build(cls, columns, policies):
+        cache = {}
+        matrix = np.array([policy_mask(p, columns, cache) for p in policies], dtype=bool)
+        matrix = matrix.reshape(len(policies), columns.n_traces)
+        return cls([p["name"] for p in policies], np.packbits(matrix, axis=1),
+                   columns.n_traces, columns.signature_ids)
+
+    @classmethod
+    def from_traces(cls, traces, policies):
+        keys = set().union(*(policy_keys(p) for p in policies))
+        return cls.build(TraceColumns(traces, keys), policies)
+
+    def mask(self, index):
+        return np.unpackbits(self.packed[index], count=self.n_traces).astype(bool)
+
+    def keep(self, actions):
+        """Traces amostrados pelas políticas com ação 1"""
+        selected = np.flatnonzero(np.asarray(actions))
+        if not len(selected):
+            return np.zeros(self.n_traces, dtype=bool)
+        packed = np.bitwise_or.reduce(self.packed[selected], axis=0)
+        return np.unpackbits(packed, count=self.n_traces).astype(bool)
+
+    def signature_counts(self, actions, population=None):
+        """Ocorrências de cada assinatura entre os traces amostrados (população opcional: índices)"""
+        keep = self.keep(actions)
+        ids = self.signature_ids[keep] if population is None else self.signature_ids[population][keep[population]]
+        return np.bincount(ids, minlength=self.n_signatures)
+
+    def evaluate(self, actions, population=None, alpha=None):
+        """(entropia, número de traces) do vetor de ações"""
+        counts = self.signature_counts(actions, population)
+        entropy = entropies(counts, ENTROPY_ALPHA if alpha is None else alpha)[0]
+        return float(entropy), int(counts.sum())
+
+    def evaluate_many(self, actions_matrix, alpha=None):
+        """Entropia e número de traces de vários vetores de ações de uma vez"""
+        counts = np.array([self.signature_counts(a) for a in actions_matrix]).reshape(-1, self.n_signatures)
+        return entropies(counts, ENTROPY_ALPHA if alpha is None else alpha), counts.sum(axis=1)
+
+    def rates(self):
+        """Fração dos traces amostrados por cada política"""
+        if not self.n_traces:
+            return np.zeros(len(self.names))
+        bits = np.unpackbits(self.packed, axis=1, count=self.n_traces)
+        return bits.sum(axis=1) / self.n_traces
+
+    def save(self, path):
+        np.savez_compressed(path, names=np.array(self.names), packed=self.packed,
+                            n_traces=self.n_traces, signature_ids=self.signature_ids)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["names"].tolist(), data["packed"], int(data["n_traces"]), data["signature_ids"])
+
+
+# ===============================================================
+# Carga dos traces
+# ===============================================================
+def load_traces(snapshot_hashes=None, synthetic=0, directory=None):
+    traces = []
+    if snapshot_hashes:
+        from span_store import SNAPSHOT_DIR, iter_snapshot_traces
+        for config_hash in snapshot_hashes:
+            traces.extend(iter_snapshot_traces(config_hash, directory or SNAPSHOT_DIR))
+    if synthetic:
+        from bench_entropy import synthetic_spans
+        traces.extend(iter_traces(synthetic_spans(synthetic)))
+    return traces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", nargs="*", default=[], help="hashes gravados com span_store.py")
+    parser.add_argument("--snapshot-dir")
+    parser.add_argument("--synthetic", type=int, default=0, help="nº de traces sintéticos (bench_entropy)")
+    parser.add_argument("--policies", default=POLICIES_FILE)
+    parser.add_argument("--output", help="grava as máscaras (.npz) para PolicyMasks.load")
+    args = parser.parse_args()
+
+    traces = load_traces(args.snapshot, args.synthetic, args.snapshot_dir)
+    if not traces:
+        parser.error("informe --snapshot ou --synthetic")
+    with open(args.policies) as f:
+        policies = json.load(f)
+
+    start = time.perf_counter()
+    keys = set().union(*(policy_keys(p) for p in policies))
+    columns = TraceColumns(traces, keys)
+    loaded = time.perf_counter()
+    masks = PolicyMasks.build(columns, policies)
+    evaluated = time.perf_counter()
+
+    print(f"{columns.n_traces} traces / {columns.n_spans} spans / {columns.n_signatures} assinaturas")
+    print(f"colunas em {loaded - start:.2f}s, {len(policies)} políticas em {(evaluated - loaded) * 1000:.1f} ms")
+    for name, rate in zip(masks.names, masks.rates()):
+        print(f"  {rate:7.2%}  {name}")
+
+    if args.output:
+        masks.save(args.output)
+        print(f"máscaras gravadas em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
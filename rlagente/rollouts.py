@@ -0,0 +1,170 @@
+"""
+Executa vários testes independentes do ReinforceAgent em paralelo, num pool
+de processos, em vez dos MAX_NUMBER_OF_TESTS testes sequenciais do manager.
+
+Cada teste tem agente e ambiente próprios e grava, como o manager,
+episodes_history_<i>.json e policies_probs_<i>.json. Ao final o runner
+agrega os testes (reward final e probabilidades médias por política).
+
+Ambientes:
+  simulado  as máscaras das políticas (policy_eval.py) são calculadas uma vez
+            e carregadas por cada worker; um worker por núcleo
+  cluster   um worker por namespace, cada um com o seu próprio coletor,
+            aplicação e Jaeger; os testes de um namespace rodam em sequência
+
+Uso:
+    python rollouts.py --synthetic 20000 --tests 25 --episodes 300
+    python rollouts.py --snapshot <hash> --tests 25 --episodes 300 --traces-per-episode 2000
+    python rollouts.py --namespaces exp-a exp-b exp-c --tests 25 --episodes 300
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from agent import ReinforceAgent
+from es_utils import es_client_for_namespace
+from policy_eval import POLICIES_FILE, PolicyMasks, load_traces
+from simulator import SimulatedCollectorEnv, add_agent_arguments, agent_kwargs, train
+
+_MASKS = None  # PolicyMasks do worker (carregadas pelo initializer)
+
+
+def _load_masks(path):
+    global _MASKS
+    _MASKS = PolicyMasks.load(path)
+
+
+def _simulated_test(test, policies, episodes, seed, traces_per_episode, reward_kwargs, agent_options):
+    # Cada teste tem a sua semente (agente e sorteio de traces)
+    env = SimulatedCollectorEnv(None, policies, traces_per_episode, seed + test, reward_kwargs, masks=_MASKS)
+    agent = ReinforceAgent(num_policies=len(policies), seed=seed + test, **agent_options)
+    history = train(env, agent, episodes)
+
+    with open(f"episodes_history_{test}.json", "w") as f:
+        json.dump(history, f, indent=2)
+    agent.save_policies(test)
+    return test, history, agent.probs.tolist()
+
+
+def _cluster_tests(namespace, tests, policies, episodes, seed, agent_options):
+    import manager
+
+    # Coletor e Elasticsearch do namespace, passados ao manager em vez das constantes do módulo
+    es_client = es_client_for_namespace(namespace)
+    results = []
+    for test in tests:
+        history = manager.run_test(test, policies, episodes, seed=seed + test, agent_options=agent_options,
+                                   namespace=namespace, es_client=es_client)
+        with open(f"policies_probs_{test}.json") as f:
+            results.append((test, history, json.load(f)))
+    return results
+
+
+def run_simulated(traces, policies, tests, episodes, workers=None, seed=0, traces_per_episode=None, reward_kwargs=None,
+                  agent_options=None):
+    """Roda `tests` treinos no ambiente simulado; retorna {teste: (histórico, probabilidades)}"""
+    masks = PolicyMasks.from_traces(traces, policies)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "masks.npz")
+        masks.save(path)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_load_masks, initargs=(path,)) as pool:
+            futures = [
+                pool.submit(_simulated_test, test, policies, episodes, seed, traces_per_episode, reward_kwargs,
+                            agent_options or {})
+                for test in range(tests)
+            ]
+            for future in as_completed(futures):
+                test, history, probs = future.result()
+                results[test] = (history, probs)
+                print(f"teste {test} concluído ({len(results)}/{tests})")
+    return results
+
+
+def run_cluster(namespaces, policies, tests, episodes, seed=0, agent_options=None):
+    """Distribui os testes entre os namespaces; cada namespace roda os seus em sequência"""
+    assignment = {ns: list(range(i, tests, len(namespaces))) for i, ns in enumerate(namespaces)}
+    results = {}
+    with ProcessPoolExecutor(max_workers=len(namespaces)) as pool:
+        futures = {
+            pool.submit(_cluster_tests, ns, assigned, policies, episodes, seed, agent_options or {}): ns
+            for ns, assigned in assignment.items() if assigned
+        }
+        for future in as_completed(futures):
+            for test, history, probs in future.result():
+                results[test] = (history, probs)
+            print(f"namespace {futures[future]} concluído ({len(results)}/{tests} testes)")
+    return results
+
+
+def summarize(results, policies):
+    """Reward médio dos últimos 10% de cada teste e média/desvio das probabilidades finais"""
+    tests = sorted(results)
+    final_rewards = []
+    for test in tests:
+        history = results[test][0]
+        tail = history[-max(1, len(history) // 10):]
+        final_rewards.append(float(np.mean([h["reward"] for h in tail])) if tail else float("nan"))
+    probs = np.array([results[test][1] for test in tests])
+    return {
+        "tests": len(tests),
+        "final_reward": {"mean": float(np.mean(final_rewards)), "std": float(np.std(final_rewards))},
+        "final_reward_by_test": dict(zip(map(str, tests), final_rewards)),
+        "policies": [
+            {"name": p["name"], "prob_mean": float(m), "prob_std": float(s)}
+            for p, m, s in zip(policies, probs.mean(axis=0), probs.std(axis=0))
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", nargs="*", default=[], help="hashes gravados com span_store.py")
+    parser.add_argument("--snapshot-dir")
+    parser.add_argument("--synthetic", type=int, default=0, help="nº de traces sintéticos (bench_entropy)")
+    parser.add_argument("--namespaces", nargs="*", default=[], help="roda no cluster, um worker por namespace")
+    parser.add_argument("--policies", default=POLICIES_FILE)
+    parser.add_argument("--tests", type=int, default=25)
+    parser.add_argument("--episodes", type=int, default=300)
+    parser.add_argument("--workers", type=int, help="processos no modo simulado (padrão: nº de CPUs)")
+    parser.add_argument("--traces-per-episode", type=int)
+    parser.add_argument("--C", type=float, default=10000, help="escala de traces da penalidade")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--summary", help="grava o resumo agregado em JSON")
+    add_agent_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.policies) as f:
+        policies = json.load(f)
+
+    start = time.perf_counter()
+    if args.namespaces:
+        results = run_cluster(args.namespaces, policies, args.tests, args.episodes, args.seed, agent_kwargs(args))
+    else:
+        traces = load_traces(args.snapshot, args.synthetic, args.snapshot_dir)
+        if not traces:
+            parser.error("informe --snapshot, --synthetic ou --namespaces")
+        results = run_simulated(traces, policies, args.tests, args.episodes, args.workers,
+                                args.seed, args.traces_per_episode, {"C": args.C}, agent_kwargs(args))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results, policies)
+    print(f"\n{summary['tests']} testes × {args.episodes} episódios em {elapsed:.1f}s")
+    print(f"Reward final: {summary['final_reward']['mean']:.4f} ± {summary['final_reward']['std']:.4f}")
+    for policy in summary["policies"]:
+        print(f"  {policy['prob_mean']:.3f} ± {policy['prob_std']:.3f}  {policy['name']}")
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
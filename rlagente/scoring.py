@@ -0,0 +1,222 @@
+"""
+Entropia, penalidade e reward — versões escalares (usadas pelo manager) e
+vetorizadas com NumPy para avaliar muitos episódios e hiperparâmetros de uma vez.
+
+A entropia só depende das multiplicidades das assinaturas de trace, então o
+histórico guarda, por episódio, o histograma dessas multiplicidades
+("signature_counts": {multiplicidade: quantas assinaturas}), que é pequeno
+e permite recalcular a entropia para qualquer α depois.
+
+Os rewards de combinações diferentes não são comparáveis entre si (alpha e
+beta mudam a escala: um alpha maior sempre daria um reward médio maior), então
+a varredura não ordena as combinações pelo reward. Para cada combinação ela
+mostra a configuração que o reward escolheria (o episódio de maior reward,
+que não muda com a escala) e agrupa as combinações que escolhem a mesma.
+
+Uso (varredura sobre históricos salvos):
+    python scoring.py episodes_history_*.json --entropy-alpha 1 2 --alpha 0.5 1 --beta 1 1.2 --C 10000 12000
+"""
+import argparse
+import glob
+import json
+import math
+import time
+from collections import Counter
+
+import numpy as np
+
+
+# ===============================================================
+# Versões escalares
+# ===============================================================
+def trace_penalty_function(traces, C, k=25, midpoint=0.20):
+    x = traces / C
+    return 1 / (1 + math.exp(-k * (x - midpoint)))
+
+
+#Função de reward para o conjunto de regras definido
+def reward_function(entropy, traces, alpha=1.0, beta=1.0, C = 10000, lambd=3.0):
+    norm_entropy = entropy/10
+
+    trace_penalty = trace_penalty_function(traces, C)
+
+    return alpha * norm_entropy - beta * trace_penalty
+
+
+# ===============================================================
+# Histograma de multiplicidades (formato do histórico)
+# ===============================================================
+def count_histogram(counter):
+    """Counter de assinaturas -> {multiplicidade: nº de assinaturas com essa multiplicidade}"""
+    histogram = {}
+    for count in counter.values():
+        histogram[count] = histogram.get(count, 0) + 1
+    return {str(k): v for k, v in sorted(histogram.items())}
+
+
+def counts_matrix(episodes):
+    """
+    Converte uma lista de episódios (Counter, lista de contagens ou histograma
+    {multiplicidade: ocorrências}) numa matriz episódios × assinaturas,
+    completada com zeros.
+    """
+    rows = []
+    for episode in episodes:
+        if isinstance(episode, Counter):
+            row = np.fromiter(episode.values(), dtype=np.int64)
+        elif isinstance(episode, dict):
+            row = np.repeat(np.array([int(k) for k in episode], dtype=np.int64),
+                            np.array(list(episode.values()), dtype=np.int64))
+        else:
+            row = np.asarray(episode, dtype=np.int64)
+        rows.append(row)
+
+    width = max((len(r) for r in rows), default=0)
+    matrix = np.zeros((len(rows), width), dtype=np.float64)
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+# ===============================================================
+# Versões vetorizadas
+# ===============================================================
+def entropies(counts, alphas=1.0):
+    """
+    Entropia de Rényi (base 2; Shannon em α == 1) de cada linha de `counts`
+    para cada α. Retorna shape (len(alphas), episódios) — ou (episódios,) se
+    `alphas` for escalar. Episódios sem traces têm entropia 0.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if counts.ndim == 1:
+        counts = counts[None, :]
+    scalar = np.ndim(alphas) == 0
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=np.float64))
+
+    totals = counts.sum(axis=1, keepdims=True)
+    p = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+    nonzero = p > 0
+    log_p = np.log2(p, out=np.zeros_like(p), where=nonzero)
+
+    result = np.empty((len(alphas), counts.shape[0]))
+    shannon = np.abs(alphas - 1.0) < 1e-12
+    if shannon.any():
+        result[shannon] = -(p * log_p).sum(axis=1)
+
+    others = ~shannon
+    if others.any():
+        a = alphas[others][:, None, None]
+        # p^α = 2^(α·log2 p), só nas posições com p > 0
+        sum_p_alpha = np.where(nonzero[None], np.exp2(a * log_p[None]), 0.0).sum(axis=2)
+        sum_p_alpha = np.maximum(sum_p_alpha, 1e-300)
+        result[others] = np.log2(sum_p_alpha) / (1.0 - a[:, :, 0])
+
+    result[:, totals[:, 0] == 0] = 0.0
+    return result[0] if scalar else result
+
+
+def trace_penalties(traces, C=10000, k=25, midpoint=0.20):
+    """trace_penalty_function com broadcasting entre traces, C, k e midpoint"""
+    x = np.asarray(traces, dtype=np.float64) / np.asarray(C, dtype=np.float64)
+    return 1.0 / (1.0 + np.exp(-np.asarray(k) * (x - np.asarray(midpoint))))
+
+
+def rewards(entropy, traces, alpha=1.0, beta=1.0, C=10000, k=25, midpoint=0.20):
+    """reward_function com broadcasting entre todos os argumentos"""
+    return np.asarray(alpha) * (np.asarray(entropy) / 10) - np.asarray(beta) * trace_penalties(traces, C, k, midpoint)
+
+
+def sweep(counts, entropy_alphas=(1.0,), alphas=(1.0,), betas=(1.0,), Cs=(10000,), k=25, midpoint=0.20):
+    """
+    Reward de cada episódio para cada combinação de hiperparâmetros.
+    Retorna array com shape (entropy_alphas, alphas, betas, Cs, episódios).
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    traces = counts.sum(axis=1)
+    H = entropies(counts, np.asarray(entropy_alphas, dtype=np.float64))     # (EA, E)
+
+    H = H[:, None, None, None, :]
+    a = np.asarray(alphas, dtype=np.float64)[None, :, None, None, None]
+    b = np.asarray(betas, dtype=np.float64)[None, None, :, None, None]
+    c = np.asarray(Cs, dtype=np.float64)[None, None, None, :, None]
+    return rewards(H, traces[None, None, None, None, :], a, b, c, k, midpoint)
+
+
+# ===============================================================
+# Varredura sobre históricos salvos
+# ===============================================================
+def selected_episodes(grid):
+    """Índice do episódio de maior reward para cada combinação (última dimensão = episódios)"""
+    return np.argmax(grid, axis=-1)
+
+
+def episode_label(episode):
+    """Identifica a configuração do episódio: hash (manager) ou vetor de ações (simulador)"""
+    if "hash" in episode:
+        return episode["hash"]
+    if "actions" in episode:
+        return "".join(str(int(a)) for a in episode["actions"])
+    return f"episódio {episode.get('episode')}"
+
+
+def load_history(paths):
+    episodes = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                episodes.extend(json.load(f))
+    return episodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("history", nargs="+", help="arquivos episodes_history_*.json")
+    parser.add_argument("--entropy-alpha", nargs="+", type=float, default=[1.0])
+    parser.add_argument("--alpha", nargs="+", type=float, default=[1.0])
+    parser.add_argument("--beta", nargs="+", type=float, default=[1.0])
+    parser.add_argument("--C", nargs="+", type=float, default=[10000])
+    args = parser.parse_args()
+
+    episodes = load_history(args.history)
+    with_counts = [e for e in episodes if "signature_counts" in e]
+    start = time.perf_counter()
+    if with_counts:
+        grid = sweep(counts_matrix([e["signature_counts"] for e in with_counts]),
+                     args.entropy_alpha, args.alpha, args.beta, args.C)
+        used = with_counts
+    else:
+        # Históricos antigos não têm as contagens: usa a entropia registrada (α do experimento)
+        print("Históricos sem 'signature_counts': varrendo apenas alpha, beta e C")
+        args.entropy_alpha = [float("nan")]
+        H = np.array([e["entropy"] for e in episodes], dtype=np.float64)
+        traces = np.array([e["number_of_traces"] for e in episodes], dtype=np.float64)
+        grid = rewards(H[None, None, None, None, :], traces[None, None, None, None, :],
+                       np.asarray(args.alpha)[None, :, None, None, None],
+                       np.asarray(args.beta)[None, None, :, None, None],
+                       np.asarray(args.C)[None, None, None, :, None])
+        used = episodes
+    selected = selected_episodes(grid)
+    elapsed = time.perf_counter() - start
+
+    mean = grid.mean(axis=-1)
+    print(f"{len(used)} episódios × {mean.size} combinações em {elapsed * 1000:.1f} ms\n")
+
+    # Agrupa as combinações (na ordem da grade) pela configuração escolhida
+    groups = {}
+    for index in np.ndindex(mean.shape):
+        groups.setdefault(episode_label(used[selected[index]]), []).append(index)
+
+    for label, combos in groups.items():
+        episode = used[selected[combos[0]]]
+        print(f"Configuração {label}: entropia {episode['entropy']:.4f}, "
+              f"{episode['number_of_traces']} traces ({len(combos)} combinações)")
+        print(f"  {'ent. α':>8}{'alpha':>8}{'beta':>8}{'C':>10}{'reward escolhido':>18}{'reward médio':>15}")
+        for i, j, l, m in combos:
+            best = grid[i, j, l, m, selected[i, j, l, m]]
+            print(f"  {args.entropy_alpha[i]:>8.2f}{args.alpha[j]:>8.2f}{args.beta[l]:>8.2f}{args.C[m]:>10.0f}"
+                  f"{best:>18.4f}{mean[i, j, l, m]:>15.4f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Ambiente simulado do coletor para treinar o ReinforceAgent sem Kubernetes.
+
+Traces gravados (snapshots do span_store, ou sintéticos) são avaliados uma
+vez contra todas as políticas de tail_sampling_policies.json (policy_eval.py).
+Um trace é amostrado se qualquer política selecionada o amostrar, como no
+processador do coletor, então cada passo é só um OU das máscaras das
+políticas escolhidas. O ambiente devolve entropia, número de traces e o
+reward, no mesmo formato do manager.
+
+A política probabilística é determinística por traceID (hash do coletor);
+com --traces-per-episode cada episódio sorteia um subconjunto dos traces.
+
+Os snapshots precisam ter sido gravados com amostragem de 100% (ex.: a
+política probabilística do collector-config.yaml), senão o replay só vê o
+que a política da época deixou passar.
+
+Uso:
+    python simulator.py --snapshot <hash> [<hash> ...] --episodes 2000
+    python simulator.py --synthetic 20000 --episodes 500 --traces-per-episode 2000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+from agent import ReinforceAgent
+from policy_eval import POLICIES_FILE, PolicyMasks, load_traces
+from scoring import reward_function
+
+
+# ===============================================================
+# Ambiente
+# ===============================================================
+class SimulatedCollectorEnv:
+    """
+    Reproduz um episódio do manager: dada a seleção de políticas (vetor de
+    ações do agente), aplica o tail sampling aos traces gravados e calcula
+    entropia, número de traces e reward.
+    """
+
+    def __init__(self, traces, policies, traces_per_episode=None, seed=None, reward_kwargs=None, masks=None):
+        # Todas as políticas são avaliadas uma vez; cada passo é um OU das máscaras.
+        # Com `masks` (PolicyMasks já calculadas) os traces não são necessários.
+        self.masks = masks if masks is not None else PolicyMasks.from_traces(traces, policies)
+        self.policies = policies
+        self.traces_per_episode = traces_per_episode
+        self.reward_kwargs = reward_kwargs or {}
+        self.rng = random.Random(seed)
+
+    def step(self, actions):
+        population = None
+        if self.traces_per_episode and self.traces_per_episode < self.masks.n_traces:
+            population = np.array(self.rng.sample(range(self.masks.n_traces), self.traces_per_episode))
+
+        entropy, number_of_traces = self.masks.evaluate(actions, population)
+        return {
+            "entropy": entropy,
+            "number_of_traces": number_of_traces,
+            "reward": reward_function(entropy, number_of_traces, **self.reward_kwargs),
+        }
+
+
+# ===============================================================
+# Treinamento
+# ===============================================================
+def train(env, agent, episodes):
+    """Treina o agente no ambiente simulado; retorna o histórico no formato do manager"""
+    history = []
+    for episode in range(1, episodes + 1):
+        _, actions = agent.select_actions(env.policies)
+        result = env.step(actions)
+        agent.learn(actions, result["reward"])
+        history.append({"episode": episode, "actions": actions, **result})
+    return history
+
+
+def add_agent_arguments(parser):
+    # Sem padrão aqui: os omitidos ficam com os do ReinforceAgent (ou os do checkpoint, com --resume)
+    group = parser.add_argument_group("agente")
+    group.add_argument("--lr", type=float, help="taxa de aprendizado dos logits (padrão: 0.8)")
+    group.add_argument("--batch-size", type=int, help="episódios por atualização (padrão: 1)")
+    group.add_argument("--entropy-coef", type=float, help="peso do bônus de entropia (padrão: 0)")
+    group.add_argument("--optimizer", choices=["sgd", "adam"], help="padrão: sgd")
+
+
+def agent_kwargs(args):
+    """Só os hiperparâmetros informados na linha de comando"""
+    options = {"lr": args.lr, "batch_size": args.batch_size, "entropy_coef": args.entropy_coef, "optimizer": args.optimizer}
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", nargs="*", default=[], help="hashes gravados com span_store.py")
+    parser.add_argument("--snapshot-dir")
+    parser.add_argument("--synthetic", type=int, default=0, help="nº de traces sintéticos (bench_entropy)")
+    parser.add_argument("--policies", default=POLICIES_FILE)
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--traces-per-episode", type=int)
+    parser.add_argument("--C", type=float, default=10000, help="escala de traces da penalidade")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="grava o histórico de episódios em JSON")
+    parser.add_argument("--checkpoint", help="grava o estado do agente ao final (ReinforceAgent.checkpoint)")
+    parser.add_argument("--resume", help="continua o treino a partir de um checkpoint (as opções do agente informadas substituem as gravadas)")
+    add_agent_arguments(parser)
+    args = parser.parse_args()
+
+    traces = load_traces(args.snapshot, args.synthetic, args.snapshot_dir)
+    if not traces:
+        parser.error("informe --snapshot ou --synthetic")
+    with open(args.policies) as f:
+        policies = json.load(f)
+
+    env = SimulatedCollectorEnv(traces, policies, args.traces_per_episode, args.seed, {"C": args.C})
+    if args.resume:
+        agent = ReinforceAgent.restore(args.resume, **agent_kwargs(args))
+    else:
+        agent = ReinforceAgent(num_policies=len(policies), seed=args.seed, **agent_kwargs(args))
+
+    start = time.perf_counter()
+    history = train(env, agent, args.episodes)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.episodes} episódios em {elapsed:.1f}s ({args.episodes / elapsed * 60:.0f} episódios/min)")
+    print(f"Reward médio (últimos 10%): {np.mean([h['reward'] for h in history[-max(1, args.episodes // 10):]]):.4f}")
+    for policy, prob in zip(policies, agent.probs):
+        print(f"  {prob:.3f}  {policy['name']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(history, f, indent=2)
+    if args.checkpoint:
+        agent.checkpoint(args.checkpoint)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Snapshots locais dos spans de um episódio, para recalcular entropia sem o
+Elasticsearch.
+
+Cada hash vira dois arquivos em SNAPSHOT_DIR:
+    <hash>.spans.jsonl  -> um span por linha (JSON compacto, só os campos de
+                           SPAN_SOURCE_FIELDS), agrupados por traceID
+    <hash>.index.json   -> [trace_id, início, fim] de cada trace no .jsonl
+
+A leitura usa mmap e o índice para entregar um trace por vez, já agrupado.
+
+Uso:
+    python span_store.py export <hash> [<hash> ...]
+    python span_store.py info <hash>
+    python span_store.py entropy <hash>
+
+Para usar os snapshots no manager/trial: SPAN_SOURCE=snapshot.
+"""
+import argparse
+import contextlib
+import json
+import mmap
+import os
+import sys
+import time
+
+from es_utils import SPAN_SOURCE_FIELDS, entropy_from_counter, count_trace_signatures, iter_spans_by_hash
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+
+
+def _paths(config_hash, directory):
+    base = os.path.join(directory, config_hash)
+    return f"{base}.spans.jsonl", f"{base}.index.json"
+
+
+def _project(source, fields):
+    """Mantém só os campos usados (o ES já filtra; aqui vale para qualquer fonte)"""
+    span = {}
+    for field in fields:
+        top = field.split(".", 1)[0]
+        if top in source and top not in span:
+            span[top] = source[top]
+    return span
+
+
+def export_snapshot(config_hash, directory=SNAPSHOT_DIR, spans=None):
+    """
+    Grava os spans de um hash (do Elasticsearch, ou de `spans` se informado,
+    desde que agrupados por traceID). Escreve em arquivos temporários e
+    renomeia ao final, então um snapshot parcial nunca é lido.
+    """
+    os.makedirs(directory, exist_ok=True)
+    spans_path, index_path = _paths(config_hash, directory)
+    if spans is None:
+        spans = iter_spans_by_hash(config_hash)
+
+    index = []
+    span_count = 0
+    current_id = None
+    trace_start = 0
+    seen = set()
+    try:
+        with open(spans_path + ".tmp", "wb") as f:
+            for source in spans:
+                trace_id = source.get("traceID")
+                if not trace_id:
+                    continue
+                if trace_id != current_id:
+                    if current_id is not None:
+                        index.append([current_id, trace_start, f.tell()])
+                    if trace_id in seen:
+                        raise ValueError(f"Spans do trace {trace_id} não estão agrupados por traceID")
+                    seen.add(trace_id)
+                    current_id = trace_id
+                    trace_start = f.tell()
+                f.write(json.dumps(_project(source, SPAN_SOURCE_FIELDS), separators=(",", ":")).encode())
+                f.write(b"\n")
+                span_count += 1
+            if current_id is not None:
+                index.append([current_id, trace_start, f.tell()])
+    except BaseException:
+        # open() pode ter falhado antes de criar o temporário: não mascara o erro original
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(spans_path + ".tmp")
+        raise
+
+    meta = {
+        "config_hash": config_hash,
+        "created_at": time.time(),
+        "spans": span_count,
+        "traces": len(index),
+        "index": index,
+    }
+    try:
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(meta, f, separators=(",", ":"))
+    except BaseException:
+        for tmp in (spans_path + ".tmp", index_path + ".tmp"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+        raise
+
+    os.replace(spans_path + ".tmp", spans_path)
+    os.replace(index_path + ".tmp", index_path)
+    return meta
+
+
+def has_snapshot(config_hash, directory=SNAPSHOT_DIR):
+    return all(os.path.exists(p) for p in _paths(config_hash, directory))
+
+
+def load_index(config_hash, directory=SNAPSHOT_DIR):
+    with open(_paths(config_hash, directory)[1]) as f:
+        return json.load(f)
+
+
+def iter_snapshot_traces(config_hash, directory=SNAPSHOT_DIR):
+    """Gera (trace_id, spans) lendo cada trace direto do mmap pelo índice"""
+    spans_path, _ = _paths(config_hash, directory)
+    index = load_index(config_hash, directory)["index"]
+    if not index:
+        return
+
+    with open(spans_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for trace_id, start, end in index:
+            yield trace_id, [json.loads(line) for line in mm[start:end].splitlines()]
+
+
+def iter_snapshot_spans(config_hash, directory=SNAPSHOT_DIR):
+    """Gera os spans do snapshot na ordem gravada (agrupados por traceID)"""
+    for _, spans in iter_snapshot_traces(config_hash, directory):
+        yield from spans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "info", "entropy"])
+    parser.add_argument("hashes", nargs="+")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    for config_hash in args.hashes:
+        if args.command == "export":
+            start = time.perf_counter()
+            meta = export_snapshot(config_hash, args.dir)
+            print(f"{config_hash}: {meta['spans']} spans / {meta['traces']} traces "
+                  f"em {time.perf_counter() - start:.1f}s -> {args.dir}")
+        elif args.command == "info":
+            meta = load_index(config_hash, args.dir)
+            size = os.path.getsize(_paths(config_hash, args.dir)[0])
+            print(f"{config_hash}: {meta['spans']} spans / {meta['traces']} traces, {size / 1e6:.1f} MB")
+        else:
+            start = time.perf_counter()
+            counter = count_trace_signatures(iter_snapshot_traces(config_hash, args.dir))
+            print(f"{config_hash}: entropia={entropy_from_counter(counter):.6f} "
+                  f"traces={sum(counter.values())} ({time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
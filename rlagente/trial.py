@@ -4,7 +4,8 @@ import hashlib
 import json
 import yaml
 import math
-from kubernetes import client, config
+import os
+from kubernetes import client, config, watch
 from agent import ReinforceAgent
 from history import *
 from es_utils import *
@@ -18,6 +19,7 @@ NAMESPACE = "rmalves"
 DEPLOYMENT_NAME = "collector"
 CONFIGMAP_NAME = "collector-config"
 POLICIES_FILE = "tail_sampling_policies.json"
+ROLLOUT_TIMEOUT_S = float(os.getenv("ROLLOUT_TIMEOUT_S", "300"))
 
 NUM_OF_EPISODES = 10
 
@@ -33,9 +35,9 @@ def generate_config(selected_policies, config_hash):
                 "expected_new_traces_per_sec": 500,
                 "policies": selected_policies
             },
-            "attributes": {
-                "actions": [
-                    {"key": "experiment_hash", "value": config_hash, "action": "insert"}
+            "resource": {
+                "attributes": [
+                    {"key": "experiment_hash", "value": config_hash, "action": "upsert"}
                 ]
             }
         },
@@ -48,7 +50,7 @@ def generate_config(selected_policies, config_hash):
             "pipelines": {
                 "traces": {
                     "receivers": ["otlp"],
-                    "processors": ["tail_sampling", "attributes"],
+                    "processors": ["tail_sampling", "resource"],
                     "exporters": ["otlphttp"]
                 },
                 "metrics": {"receivers": ["otlp"], "exporters": ["prometheus"]}
@@ -74,17 +76,42 @@ def update_configmap(config_yaml):
 
 def rolling_update_deployment(config_yaml, config_hash):
     patch = {"spec": {"template": {"metadata": {"annotations": {"config-hash": config_hash}}}}}
-    apps_v1.patch_namespaced_deployment(name=DEPLOYMENT_NAME, namespace=NAMESPACE, body=patch)
+    deployment = apps_v1.patch_namespaced_deployment(name=DEPLOYMENT_NAME, namespace=NAMESPACE, body=patch)
+    return deployment.metadata.generation
 
 
-def wait_for_rollout_ready():
+def rollout_complete(deployment, generation):
+    # Mesmos critérios do kubectl rollout status: novo spec observado, só réplicas novas, todas disponíveis
+    desired = deployment.spec.replicas if deployment.spec.replicas is not None else 1
+    status = deployment.status
+    if status is None or (status.observed_generation or 0) < generation:
+        return False
+    updated = status.updated_replicas or 0
+    return updated == desired and (status.replicas or 0) == updated and (status.available_replicas or 0) == updated
+
+
+def wait_for_rollout_ready(generation=None, timeout=ROLLOUT_TIMEOUT_S):
+    if generation is None:
+        generation = apps_v1.read_namespaced_deployment(DEPLOYMENT_NAME, NAMESPACE).metadata.generation
+
+    deadline = time.monotonic() + timeout
     while True:
-        deployment = apps_v1.read_namespaced_deployment(DEPLOYMENT_NAME, NAMESPACE)
-        desired = deployment.spec.replicas
-        available = deployment.status.available_replicas or 0
-        if available >= desired:
-            return
-        time.sleep(2)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"Rollout de {DEPLOYMENT_NAME} (geração {generation}) não terminou em {timeout:.0f}s; seguindo mesmo assim")
+            return False
+        w = watch.Watch()
+        try:
+            for event in w.stream(apps_v1.list_namespaced_deployment, NAMESPACE,
+                                  field_selector=f"metadata.name={DEPLOYMENT_NAME}",
+                                  timeout_seconds=max(1, int(remaining))):
+                if event["type"] != "DELETED" and rollout_complete(event["object"], generation):
+                    return True
+        except client.exceptions.ApiException as e:
+            if e.status != 410:  # resourceVersion expirado: reabre o watch
+                raise
+        finally:
+            w.stop()
 
 
 def trace_penalty_function(traces, C, k=25, midpoint=0.10):
@@ -133,8 +160,8 @@ def objective(trial):
         config_yaml = generate_config(selected_policies, config_hash)
 
         update_configmap(config_yaml)
-        rolling_update_deployment(config_yaml, config_hash)
-        wait_for_rollout_ready()
+        generation = rolling_update_deployment(config_yaml, config_hash)
+        wait_for_rollout_ready(generation)
 
         # Coleta métricas e calcula reward
         entropy, num_traces = export_traces_by_hash(old_hash)